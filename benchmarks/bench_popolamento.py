@@ -0,0 +1,66 @@
+"""Benchmark del popolamento dell'ontologia: assegnazione per attributo contro inserimento in blocco.
+
+Per ogni numero di TrattoStradale sintetici (onto/motore_regole.py, frame_sintetico) popola
+l'ontologia due volte con gli stessi fatti:
+- attributi : un individuo e un'assegnazione per proprietà alla volta (popola_da_frame)
+- blocco    : triple inserite con executemany nel quadstore (onto/popolamento_massivo.py)
+e controlla che le triple scritte coincidano, poi distrugge gli individui.
+
+Uso (dalla radice del repository):
+    python benchmarks/bench_popolamento.py --dimensioni 1000,10000,100000 --output Results/bench_popolamento.csv
+"""
+
+import os
+import sys
+import csv
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from owlready2 import destroy_entity  # noqa: E402
+from onto.carica_ontologia import onto  # noqa: E402
+from onto.motore_regole import frame_sintetico, popola_da_frame  # noqa: E402
+from onto.popolamento_massivo import popola_in_blocco  # noqa: E402
+
+def triple(prefisso):
+    """Triple (nome senza prefisso, proprietà, valore) degli individui con il prefisso dato"""
+    risultato = []
+    for tabella, colonne in (("objs", "t.p, t.o, NULL"), ("datas", "t.p, t.o, t.d")):
+        righe = onto.world.graph.execute(
+            f"SELECT r.iri, {colonne} FROM {tabella} t JOIN resources r ON r.storid = t.s "
+            f"WHERE substr(r.iri, 1, ?) = ?", (len(onto.base_iri) + len(prefisso) + 1, f"{onto.base_iri}{prefisso}_"))
+        risultato += [(iri[len(onto.base_iri) + len(prefisso):], p, o, d) for iri, p, o, d in righe]
+    return sorted(risultato, key=str)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Popolamento dell'ontologia per attributo e in blocco")
+    parser.add_argument("--dimensioni", default="1000,10000,100000")
+    parser.add_argument("--output", default="Results/bench_popolamento.csv")
+    args = parser.parse_args()
+
+    righe = []
+    for n in [int(d) for d in args.dimensioni.split(",")]:
+        frame = frame_sintetico(n)
+
+        inizio = time.perf_counter()
+        per_attributo = popola_da_frame(frame, onto, prefisso="Attributi")
+        secondi_attributi = time.perf_counter() - inizio
+
+        inizio = time.perf_counter()
+        in_blocco = popola_in_blocco(frame, onto, [f"Blocco_{i}" for i in range(n)])
+        secondi_blocco = time.perf_counter() - inizio
+
+        coincidono = triple("Attributi") == triple("Blocco")
+        for te in per_attributo + in_blocco:
+            destroy_entity(te)
+
+        righe.append({"tratti": n, "secondi_attributi": secondi_attributi, "secondi_blocco": secondi_blocco,
+                      "accelerazione": secondi_attributi / secondi_blocco, "triple_identiche": coincidono})
+        print(f"⏱️  {n:>7} tratti: per attributo {secondi_attributi:.2f}s, in blocco {secondi_blocco:.2f}s "
+              f"(x{secondi_attributi / secondi_blocco:.1f}), triple identiche: {coincidono}")
+
+    with open(args.output, "w", newline="") as f:
+        scrittore = csv.DictWriter(f, fieldnames=list(righe[0]))
+        scrittore.writeheader()
+        scrittore.writerows(righe)
+    print(f"💾 Risultati salvati in {args.output}")
@@ -0,0 +1,145 @@
+"""Benchmark dei ragionatori dell'ontologia SafeDrive al crescere della rete.
+
+Per ogni numero di TrattoStradale sintetici (onto/motore_regole.py, frame_sintetico) e per ogni
+backend misura separatamente popolamento, ragionamento ed estrazione delle conclusioni:
+- pellet, hermit : individui nell'ontologia, sync_reasoner_pellet / sync_reasoner (HermiT) di owlready2
+- persistente    : individui nell'ontologia, JVM di Pellet già avviata (onto/pellet_persistente.py)
+- nativo         : motore NumPy delle regole (onto/motore_regole.py)
+- firme          : Pellet una volta per firma (onto/firme_regole.py), memoria vuota a ogni misura
+- compilato      : tabella di decisione generata (onto/compilatore_regole.py)
+Per i backend in-process il popolamento è nullo: lavorano direttamente sul frame colonnare.
+La colonna concorda indica se le conclusioni coincidono con quelle del motore nativo
+e la colonna errore riporta il motivo se il backend fallisce (HermiT rifiuta le regole SWRL
+con builtin di confronto, cioè quasi tutte quelle di onto/ontology.py).
+
+Uso (dalla radice del repository):
+    python benchmarks/bench_ragionatore.py --dimensioni 10,100,1000,10000,100000 --output Results/bench_ragionatore
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from functools import lru_cache
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from onto.motore_regole import MotoreRegole, frame_sintetico, popola_da_frame, leggi_conclusioni, conclusioni_diverse  # noqa: E402
+
+BACKEND = ("pellet", "hermit", "persistente", "nativo", "firme", "compilato")
+BACKEND_OWL = ("pellet", "hermit", "persistente")
+
+@lru_cache(maxsize=None)
+def pellet_persistente(motore):
+    """JVM persistente avviata una volta sola: l'avvio resta fuori dalle misure"""
+    from onto.pellet_persistente import PelletPersistente
+    pellet = PelletPersistente(motore.ontologia)
+    pellet.avvia()
+    return pellet
+
+def misura_owl(backend, frame, motore):
+    """Tempi (popolamento, ragionamento, estrazione) e conclusioni con un ragionatore Java di owlready2"""
+    from owlready2 import sync_reasoner_pellet, sync_reasoner, destroy_entity
+    if backend == "persistente":
+        pellet_persistente(motore)
+    inizio = time.perf_counter()
+    individui = popola_da_frame(frame, motore.ontologia, prefisso="Bench")
+    popolamento = time.perf_counter() - inizio
+
+    try:
+        inizio = time.perf_counter()
+        with motore.ontologia:
+            if backend == "pellet":
+                sync_reasoner_pellet(infer_property_values=True, infer_data_property_values=True, debug=0)
+            elif backend == "persistente":
+                pellet_persistente(motore).ragiona(individui)
+            else:
+                sync_reasoner(infer_property_values=True, debug=0)
+        ragionamento = time.perf_counter() - inizio
+
+        inizio = time.perf_counter()
+        conclusioni = leggi_conclusioni(individui, frame.index)
+        estrazione = time.perf_counter() - inizio
+    finally:
+        if backend == "persistente":
+            pellet_persistente(motore).dimentica(individui)
+        for te in individui:
+            destroy_entity(te)
+    return popolamento, ragionamento, estrazione, conclusioni
+
+def misura_in_process(backend, frame, motore):
+    """Tempi (popolamento nullo, ragionamento, estrazione) e conclusioni di un motore in-process"""
+    if backend == "nativo":
+        inizio = time.perf_counter()
+        oggetti, _ = motore.ragiona(frame)
+        ragionamento = time.perf_counter() - inizio
+        inizio = time.perf_counter()
+        conclusioni = motore.conclusioni(frame) #ragiona di nuovo: si sottrae il tempo di ragionamento
+        estrazione = max(time.perf_counter() - inizio - ragionamento, 0.0)
+        return 0.0, ragionamento, estrazione, conclusioni
+
+    if backend == "firme":
+        from onto.firme_regole import MemoriaConclusioni
+        inizio = time.perf_counter()
+        conclusioni = MemoriaConclusioni(motore).conclusioni(frame)
+        return 0.0, time.perf_counter() - inizio, 0.0, conclusioni
+
+    from onto.compilatore_regole import carica_regole_compilate
+    modulo = carica_regole_compilate()
+    inizio = time.perf_counter()
+    modulo.ragiona(frame)
+    ragionamento = time.perf_counter() - inizio
+    inizio = time.perf_counter()
+    conclusioni = modulo.conclusioni_da_tabella(frame)
+    return 0.0, ragionamento, time.perf_counter() - inizio, conclusioni
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ragionatori dell'ontologia a diverse dimensioni della rete")
+    parser.add_argument("--dimensioni", default="10,100,1000,10000,100000")
+    parser.add_argument("--backend", default=",".join(BACKEND))
+    parser.add_argument("--limite-owl", type=int, default=10_000,
+                        help="oltre questo numero di tratti pellet, hermit e persistente non vengono eseguiti")
+    parser.add_argument("--output", default="Results/bench_ragionatore", help="prefisso dei file .csv e .json")
+    args = parser.parse_args()
+
+    motore = MotoreRegole()
+    righe = []
+    for n in [int(d) for d in args.dimensioni.split(",")]:
+        frame = frame_sintetico(n)
+        riferimento = motore.conclusioni(frame)
+        for backend in args.backend.split(","):
+            if backend in BACKEND_OWL and n > args.limite_owl:
+                print(f"⏭️  {backend:<11} {n:>7} tratti: oltre --limite-owl, saltato")
+                continue
+            misura = misura_owl if backend in BACKEND_OWL else misura_in_process
+            try:
+                popolamento, ragionamento, estrazione, conclusioni = misura(backend, frame, motore)
+                errore = None
+            except Exception as e:
+                print(f"❌ {backend:<11} {n:>7} tratti: {type(e).__name__}")
+                righe.append({"backend": backend, "tratti": n, "secondi_popolamento": None,
+                              "secondi_ragionamento": None, "secondi_estrazione": None, "secondi_totali": None,
+                              "concorda": False, "errore": str(e).strip().splitlines()[-1]})
+                continue
+            riga = {
+                "backend": backend,
+                "tratti": n,
+                "secondi_popolamento": popolamento,
+                "secondi_ragionamento": ragionamento,
+                "secondi_estrazione": estrazione,
+                "secondi_totali": popolamento + ragionamento + estrazione,
+                "concorda": len(conclusioni_diverse(conclusioni, riferimento)) == 0,
+                "errore": errore,
+            }
+            righe.append(riga)
+            print(f"⏱️  {backend:<11} {n:>7} tratti: popolamento {popolamento:.3f}s, ragionamento {ragionamento:.3f}s, "
+                  f"estrazione {estrazione:.3f}s, concorda: {riga['concorda']}")
+
+    with open(f"{args.output}.csv", "w", newline="") as f:
+        scrittore = csv.DictWriter(f, fieldnames=list(righe[0]))
+        scrittore.writeheader()
+        scrittore.writerows(righe)
+    with open(f"{args.output}.json", "w") as f:
+        json.dump(righe, f, indent=2)
+    print(f"💾 Risultati salvati in {args.output}.csv e {args.output}.json")
@@ -0,0 +1,75 @@
+"""Benchmark del tempo di avvio a freddo per ogni punto di ingresso di SafeDrive.
+
+Ogni punto di ingresso viene eseguito più volte in un interprete nuovo con `python -X importtime`:
+si misurano il tempo totale del processo e il tempo speso negli import, così da tenere sotto
+controllo gli import pigri di data_model_onto_csp_integration.
+
+Uso (dalla radice del repository):
+    python benchmarks/tempo_avvio.py --ripetizioni 5 --output Results/tempo_avvio.csv
+"""
+
+import os
+import re
+import sys
+import csv
+import time
+import argparse
+import statistics
+import subprocess
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PUNTI_INGRESSO = {
+    "import integrazione": "import data_model_onto_csp_integration",
+    "import main": "import main",
+    "solo predizione": (
+        "import data_model_onto_csp_integration as sd\n"
+        "d = sd.carica_dataset('data/road_system.csv')\n"
+        "m = sd.carica_modello('models/logistic_regression_model.pkl')\n"
+        "sd.predizione(m, sd.preprocessa_dataset(d, add_scaler=True))"
+    ),
+    "solo ontologia": "import data_model_onto_csp_integration as sd\nsd.mappe_ontologia()",
+    "solo CSP": (
+        "import data_model_onto_csp_integration  # noqa: F401\n"
+        "from csp.road_plannerCSP import csp_builder\n"
+        "csp_builder([50, 60, 70])"
+    ),
+}
+
+RIGA_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|")
+
+def misura(codice):
+    """Esegue il codice in un interprete nuovo, restituisce (secondi totali, secondi di import, moduli importati)"""
+    inizio = time.perf_counter()
+    processo = subprocess.run([sys.executable, "-X", "importtime", "-c", codice],
+                              cwd=RADICE, capture_output=True, text=True)
+    totale = time.perf_counter() - inizio
+    if processo.returncode != 0:
+        raise RuntimeError(processo.stderr.strip().splitlines()[-1])
+    tempi = [int(m.group(1)) for m in RIGA_IMPORTTIME.finditer(processo.stderr)]
+    return totale, sum(tempi) / 1e6, len(tempi)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tempo di avvio a freddo dei punti di ingresso di SafeDrive")
+    parser.add_argument("--ripetizioni", type=int, default=5)
+    parser.add_argument("--output", default="Results/tempo_avvio.csv")
+    args = parser.parse_args()
+
+    righe = []
+    for nome, codice in PUNTI_INGRESSO.items():
+        misure = [misura(codice) for _ in range(args.ripetizioni)]
+        riga = {
+            "punto_ingresso": nome,
+            "secondi_totali": statistics.median(m[0] for m in misure),
+            "secondi_import": statistics.median(m[1] for m in misure),
+            "moduli_importati": misure[-1][2],
+        }
+        righe.append(riga)
+        print(f"⏱️  {nome:<22} totale {riga['secondi_totali']:.3f}s, import {riga['secondi_import']:.3f}s "
+              f"({riga['moduli_importati']} moduli)")
+
+    with open(os.path.join(RADICE, args.output), "w", newline="") as f:
+        scrittore = csv.DictWriter(f, fieldnames=list(righe[0]))
+        scrittore.writeheader()
+        scrittore.writerows(righe)
+    print(f"💾 Risultati salvati in {args.output}")
@@ -10,9 +10,7 @@
 
 import random
 from variable import Variable
-# for showing csps:
-import matplotlib.pyplot as plt
-import matplotlib.lines as lines
+# for showing csps: matplotlib is imported by show() and draw_graph(), so solving a CSP does not pay for it
 
 class Constraint(object):
     """A Constraint consists of
@@ -81,6 +79,7 @@ class CSP(object):
                     if con.can_evaluate(assignment))
 
     def show(self, linewidth=3, showDomains=False, showAutoAC = False):
+        import matplotlib.pyplot as plt
         self.linewidth = linewidth
         self.picked = None
         plt.ion()   # interactive
@@ -98,6 +97,7 @@ class CSP(object):
         self.draw_graph(domains=domains)
 
     def draw_graph(self, domains={}, to_do = {}, title=None, fontsize=10):
+        import matplotlib.lines as lines
         self.ax.clear()
         self.ax.set_axis_off()
         if title:
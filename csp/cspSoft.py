@@ -15,9 +15,13 @@ class SoftConstraint(Constraint):
     * function: a real-valued costs function that can applied to a tuple of values
     * string: a string for printing the constraints. All of the strings must be unique.
     for the variables
+    * separable: optional (constant, [f_1,...,f_k]) such that
+      function(v_1,...,v_k) == constant + f_1(v_1) + ... + f_k(v_k),
+      so branch and bound can bound the constraint one variable at a time
     """
-    def __init__(self, scope, function, string=None, position=None):
+    def __init__(self, scope, function, string=None, position=None, separable=None):
         Constraint.__init__(self, scope, function, string, position)
+        self.separable = separable
 
     def value(self,assignment):
         return self.holds(assignment)
@@ -59,11 +63,18 @@ scsp2 = CSP("scsp1", {A,B,C,D,E}, [c1,c2,c3,c4,c5,c6])
 
 from display import Displayable
 import math
+import itertools
 
 class DF_branch_and_bound_opt(Displayable):
     """returns a branch and bound searcher for a problem.    
     An optimal assignment with cost less than bound can be found by calling search()
+    A partial assignment is pruned as soon as its cost plus an admissible lower bound
+    on the constraints not yet evaluated reaches the bound. The bound comes from
+    mini-bucket elimination (compile_bounds), computed once before the search.
     """
+    max_enumerate = 1000 # most joint values enumerated to find the minimum of a constraint
+    tolerance = 1e-9 # the bounds are sums of floats: rounding must not prune an optimum
+
     def __init__(self, csp, bound=math.inf):
         """creates a searcher than can be used with search() to find an optimal path.
         bound gives the initial bound. By default this is infinite - meaning there
@@ -72,11 +83,75 @@ class DF_branch_and_bound_opt(Displayable):
         self.csp = csp
         self.best_asst = None
         self.bound = bound
+        self.order = self.variable_order()
+        self.compile_bounds()
+
+    def variable_order(self):
+        """starts from a variable in the fewest constraints, then always picks the variable
+        sharing the most constraints with those already ordered (a chain is ordered end to end)"""
+        remaining = sorted(self.csp.variables, key=lambda v: (len(self.csp.var_to_const[v]), str(v)))
+        order = []
+        while remaining:
+            var = max(remaining, key=lambda v: sum(1 for con in self.csp.var_to_const[v]
+                                                   for w in con.scope if w in order))
+            order.append(var)
+            remaining.remove(var)
+        return order
+
+    def compile_bounds(self):
+        """mini-bucket elimination along the reversed order, with functions of at most two variables.
+        Unary and binary constraints become tables, separable constraints one table per variable;
+        the other constraints are bounded during the search by their minimum (minimum).
+        Each bucket is split into mini-buckets, one per other variable, and eliminating the bucket's
+        variable by minimization sends a message (a table on the other variable) to an earlier bucket.
+        The messages leaving buckets of unassigned variables for assigned ones (or for no variable)
+        bound the cost of all the constraints not yet evaluated.
+        """
+        position = {var:i for i,var in enumerate(self.order)}
+        buckets = [[] for var in self.order]
+        self.dynamic = [] # constraints bounded during the search
+        for con in self.csp.constraints:
+            separable = getattr(con, "separable", None)
+            if separable is not None:
+                for var, fun in zip(con.scope, separable[1]):
+                    buckets[position[var]].append(((var,), {(val,):fun(val) for val in var.domain}))
+            elif len(con.scope) <= 2:
+                table = {vals:con.holds(dict(zip(con.scope, vals)))
+                         for vals in itertools.product(*(var.domain for var in con.scope))}
+                buckets[max(position[var] for var in con.scope)].append((tuple(con.scope), table))
+            else:
+                self.dynamic.append(con)
+
+        messages = [[] for var in self.order] # messages sent by each bucket
+        for k in reversed(range(len(self.order))):
+            var = self.order[k]
+            mini_buckets = {}
+            for fun in buckets[k]:
+                others = [w for w in fun[0] if w is not var]
+                mini_buckets.setdefault(others[0] if others else None, []).append(fun)
+            unary = mini_buckets.pop(None, [])
+            if mini_buckets: # the unary functions join (only) the mini-bucket of the latest variable
+                mini_buckets[max(mini_buckets, key=position.get)] += unary
+            else:
+                mini_buckets[None] = unary
+            for other, funs in mini_buckets.items():
+                cost = lambda x, y: sum(table[tuple(x if w is var else y for w in scope)] for scope, table in funs)
+                if other is None:
+                    messages[k].append(((), {(): min(cost(x, None) for x in var.domain)}))
+                else:
+                    message = ((other,), {(y,): min(cost(x, y) for x in var.domain) for y in other.domain})
+                    messages[k].append(message)
+                    buckets[position[other]].append(message)
+        self.buckets = buckets
+        # crossing[p]: messages from buckets p, p+1, ... to buckets before p (or to no bucket)
+        self.crossing = [[m for k in range(p, len(self.order)) for m in messages[k]
+                          if not m[0] or position[m[0][0]] < p] for p in range(len(self.order) + 1)]
 
     def optimize(self):
         """returns an optimal solution to a problem with cost less than bound.
         returns None if there is no solution with cost less than bound."""
         self.num_expanded=0
+        self.minima = {}
         self.cbsearch({}, 0, self.csp.constraints)
         #self.display(1,"Number of paths expanded:",self.num_expanded) commentato per ridurre la verbosità
         return self.best_asst, self.bound
@@ -88,16 +163,45 @@ class DF_branch_and_bound_opt(Displayable):
         rem_cons = [c for c in constraints if c not in can_eval]
         newcost = cost + sum(c.value(asst) for c in can_eval)
         #self.display(2,"Evaluating:",can_eval,"cost:",newcost)
-        if newcost < self.bound:
-            self.num_expanded += 1
-            if rem_cons==[]:
+        if rem_cons==[]:
+            if newcost < self.bound:
+                self.num_expanded += 1
                 self.best_asst = asst
                 self.bound = newcost
                 #self.display(1,"New best assignment:",asst," cost:",newcost)
+        elif newcost + self.lower_bound(asst, rem_cons) < self.bound + self.tolerance:
+            self.num_expanded += 1
+            var = self.order[len(asst)]
+            # the most promising values first: good solutions found early let the bound prune more
+            bucket = self.buckets[len(asst)]
+            for val in sorted(var.domain, key=lambda val: sum(table[tuple(val if w is var else asst[w] for w in scope)]
+                                                             for scope, table in bucket)):
+                self.cbsearch({var:val}|asst, newcost, rem_cons)
+
+    def lower_bound(self, asst, rem_cons):
+        """admissible lower bound on the cost of rem_cons for every extension of asst
+        (asst assigns the first len(asst) variables of the order)"""
+        bound = sum(table[tuple(asst[w] for w in scope)] for scope, table in self.crossing[len(asst)])
+        for con in rem_cons:
+            separable = getattr(con, "separable", None)
+            if separable is not None: # the shares of the unassigned variables are in the messages
+                bound += separable[0] + sum(fun(asst[var]) for var, fun in zip(con.scope, separable[1])
+                                            if var in asst)
+            elif con in self.dynamic:
+                bound += self.minimum(con, asst)
+        return bound
+
+    def minimum(self, con, asst):
+        """minimum of con over its unassigned variables, -inf if there are too many joint values"""
+        unassigned = [var for var in con.scope if var not in asst]
+        key = (con, tuple(asst[var] for var in con.scope if var in asst))
+        if key not in self.minima:
+            if math.prod(len(var.domain) for var in unassigned) > self.max_enumerate:
+                self.minima[key] = -math.inf
             else:
-                var = next(var for var in self.csp.variables if var not in asst)
-                for val in var.domain:
-                    self.cbsearch({var:val}|asst, newcost, rem_cons)
+                self.minima[key] = min(con.holds(dict(zip(unassigned, vals))|asst)
+                                       for vals in itertools.product(*(var.domain for var in unassigned)))
+        return self.minima[key]
 
 # bnb = DF_branch_and_bound_opt(scsp1)
 # bnb.max_display_level=3 # show more detail
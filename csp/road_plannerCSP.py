@@ -76,7 +76,10 @@ def csp_builder(lista_limiti_segmenti):
         # Più la velocità totale è alta, più il costo scende.
         return 1000 - (velocità_totale / 5.0)
 
-    constraints.append(SoftConstraint(variabili, costo_lentezza, "Efficienza_Globale"))
+    # Il costo è 1000 meno un termine per segmento: separabile, così il branch and bound
+    # può stimare il costo minimo dei segmenti non ancora assegnati
+    constraints.append(SoftConstraint(variabili, costo_lentezza, "Efficienza_Globale",
+                                      separable=(1000, [lambda v: -v / 5.0] * num_segmenti)))
 
     return CSP("Traffico Autostradale", variables=set(variabili), constraints=constraints)
 
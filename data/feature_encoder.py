@@ -0,0 +1,163 @@
+"""Encoder delle feature congelato al momento dell'addestramento.
+
+Trasforma righe grezze in stile road_system.csv direttamente nella matrice float32
+attesa dai modelli, con tabelle fisse categoria -> colonna e media/deviazione standard
+del training, senza get_dummies né scaler riallenati sul batch di inferenza.
+Viene salvato accanto al .pkl del modello a cui appartiene.
+
+Costruzione degli encoder di entrambi i modelli dal csv di training (dalla radice del repository):
+    python -m data.feature_encoder data/train.csv
+"""
+
+import os
+import numpy as np
+
+EXPECTED_FEATURES = [
+    "num_lanes",
+    "curvature",
+    "speed_limit",
+    "road_signs_present",
+    "public_road",
+    "holiday",
+    "school_season",
+    "road_type_highway",
+    "road_type_rural",
+    "road_type_urban",
+    "weather_clear",
+    "weather_foggy",
+    "weather_rainy",
+    "time_of_day_afternoon",
+    "time_of_day_evening",
+    "time_of_day_morning",
+    "lighting_daylight",
+    "lighting_dim",
+    "lighting_night",
+]
+
+CATEGORICAL_COLS = ['road_type', "weather", "time_of_day", "lighting"]
+NUMERIC_FEATURES = ['speed_limit', 'curvature'] # le colonne scalate per il classificatore
+
+MPH_KMH = 1.60934
+
+# Modelli di main.py e server.py -> scala: solo la regressione logistica è allenata sui dati scalati
+MODELLI = {
+    "models/logistic_regression_model_negloglossTarget.pkl": True,
+    "models/random_forest_model.pkl": False,
+}
+
+def percorso_encoder(path_modello):
+    """L'encoder vive accanto al modello: models/x.pkl -> models/x_encoder.pkl"""
+    return f"{os.path.splitext(path_modello)[0]}_encoder.pkl"
+
+class FeatureEncoder(object):
+    """
+    scala : se True applica media e deviazione standard del training alle NUMERIC_FEATURES
+    (come lo StandardScaler usato per la regressione logistica)
+    """
+    def __init__(self, scala=False):
+        self.scala = scala
+        self.indice = {col: j for j, col in enumerate(EXPECTED_FEATURES)}
+
+        # Tabelle fisse categoria -> colonna, ricavate dai nomi prodotti da get_dummies
+        self.categorie = {col: {f[len(col) + 1:]: j for f, j in self.indice.items() if f.startswith(col + "_")}
+                          for col in CATEGORICAL_COLS}
+        codificate = {j for tabella in self.categorie.values() for j in tabella.values()}
+        self.dirette = [c for c in EXPECTED_FEATURES
+                        if c not in NUMERIC_FEATURES and self.indice[c] not in codificate]
+
+        self.media = {col: 0.0 for col in NUMERIC_FEATURES}
+        self.scarto = {col: 1.0 for col in NUMERIC_FEATURES}
+
+    def fit(self, segmenti_stradali):
+        """Memorizza media e deviazione standard del dataset di training (non processato)"""
+        if self.scala:
+            for col in NUMERIC_FEATURES:
+                valori = self.valori_numerici(segmenti_stradali, col)
+                self.media[col] = float(valori.mean())
+                scarto = float(valori.std())
+                self.scarto[col] = scarto if scarto > 0 else 1.0 # come StandardScaler sulle colonne costanti
+        return self
+
+    def fit_a_blocchi(self, blocchi):
+        """Come fit, su un dataset letto a blocchi: medie e varianze dei blocchi combinate una colonna alla volta"""
+        if self.scala:
+            stato = {col: (0, 0.0, 0.0) for col in NUMERIC_FEATURES} # righe, media, somma degli scarti al quadrato
+            for blocco in blocchi:
+                for col in NUMERIC_FEATURES:
+                    valori = self.valori_numerici(blocco, col)
+                    n, media, quadrati = stato[col]
+                    n_blocco, media_blocco = len(valori), float(valori.mean())
+                    delta = media_blocco - media
+                    stato[col] = (n + n_blocco, media + delta * n_blocco / (n + n_blocco),
+                                  quadrati + float(((valori - media_blocco) ** 2).sum())
+                                  + delta ** 2 * n * n_blocco / (n + n_blocco))
+            for col, (n, media, quadrati) in stato.items():
+                if n:
+                    self.media[col] = media
+                    scarto = (quadrati / n) ** 0.5
+                    self.scarto[col] = scarto if scarto > 0 else 1.0
+        return self
+
+    @staticmethod
+    def valori_numerici(segmenti_stradali, col):
+        valori = np.asarray(segmenti_stradali[col], dtype=np.float64)
+        return valori * MPH_KMH if col == 'speed_limit' else valori
+
+    def scala_colonna(self, col, valori):
+        """Applica la scalatura del training a una colonna numerica già in km/h"""
+        if self.scala and col in self.media:
+            return (valori - self.media[col]) / self.scarto[col]
+        return valori
+
+    def trasforma(self, segmenti_stradali):
+        """
+        segmenti_stradali : dataframe (o dizionario di colonne) di road_system.csv non processato
+        Restituisce una matrice float32 (righe x EXPECTED_FEATURES)
+        """
+        n = len(segmenti_stradali['speed_limit'])
+        X = np.zeros((n, len(EXPECTED_FEATURES)), dtype=np.float32)
+
+        for col in self.dirette:
+            X[:, self.indice[col]] = np.asarray(segmenti_stradali[col], dtype=np.float64)
+
+        for col in NUMERIC_FEATURES:
+            X[:, self.indice[col]] = self.scala_colonna(col, self.valori_numerici(segmenti_stradali, col))
+
+        for col, tabella in self.categorie.items():
+            valori = np.asarray(segmenti_stradali[col])
+            for categoria, j in tabella.items():
+                X[:, j] = valori == categoria
+        return X
+
+    def salva(self, path_modello):
+        import joblib
+        path = percorso_encoder(path_modello)
+        joblib.dump(self, path)
+        print(f"💾 Encoder salvato in {path}")
+        return path
+
+def carica_encoder(path_modello):
+    """Restituisce l'encoder salvato accanto al modello, None se non è stato costruito"""
+    import joblib
+    path = percorso_encoder(path_modello)
+    if not os.path.exists(path):
+        return None
+    return joblib.load(path)
+
+def costruisci_encoder(segmenti_training, modelli=MODELLI):
+    """Allena sul training (non processato) e salva accanto a ogni modello il suo encoder"""
+    return [FeatureEncoder(scala=scala).fit(segmenti_training).salva(path) for path, scala in modelli.items()]
+
+if __name__ == "__main__":
+    import sys
+    import pandas as pd
+    # con python -m la classe di questo file è __main__.FeatureEncoder: il pickle deve riferirsi al modulo
+    from data.feature_encoder import costruisci_encoder
+
+    path_training = sys.argv[1] if len(sys.argv) > 1 else "data/train.csv"
+    try:
+        training = pd.read_csv(path_training)
+    except FileNotFoundError:
+        print(f"❌ Errore: csv di training {path_training} non trovato.")
+        sys.exit(1)
+    costruisci_encoder(training.dropna())
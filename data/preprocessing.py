@@ -61,6 +61,13 @@ if df.isnull().values.any():
     df = df.dropna() #Il dataser è grande, eventuali valori nulli possono essere rimossi
     print(f"Nuove dimensioni dopo la rimozione dei nulli: {df.shape}")
 
+# %% [3b] Encoder delle feature per l'inferenza
+# Congeliamo tabelle di codifica e media/deviazione standard del training accanto ai modelli,
+# così in inferenza non serve rifare get_dummies né riallenare lo scaler sul batch
+# (gli stessi file si ricostruiscono con: python -m data.feature_encoder data/train.csv)
+from data.feature_encoder import costruisci_encoder
+costruisci_encoder(df)
+
 # Conversione speed_limit da miglia orarie a km/h
 df['speed_limit'] = df['speed_limit'] * 1.60934
 print("✅ Speed limit convertito da mph a km/h")
@@ -1,39 +1,65 @@
-import pandas as pd
-import joblib
-from sklearn.preprocessing import StandardScaler
-import onto.ontology as owl_onto
-from owlready2 import sync_reasoner_pellet
-from onto.ontology import onto as my_ontology
-
-#from csp.variable import Variable
-from csp.road_plannerCSP import csp_builder
-from csp.cspSoft import DF_branch_and_bound_opt
-
-road_type = {
-    'highway': owl_onto.Autostrada,
-    'urban': owl_onto.Urbana,
-    'rural': owl_onto.Rurale,
-}
-
-lighting = {
-    "night": owl_onto.Notturno,
-    "dim": owl_onto.Penombra,
-    "day": owl_onto.Diurno,
-}
-
-weather = {
-    "clear": owl_onto.Sole,
-    "rainy": owl_onto.Pioggia,
-    "foggy": owl_onto.Nebbia,
-}
-
-time_of_day = {
-    "morning": owl_onto.Mattina,
-    "afternoon": owl_onto.Pomeriggio,
-    "evening": owl_onto.Sera,
-}
+import os
+import warnings
+from functools import lru_cache
+from collections import OrderedDict
+
+# Le dipendenze pesanti (pandas, sklearn, owlready2 con l'ontologia, moduli CSP) vengono importate
+# dentro le funzioni che le usano: ogni fase della pipeline paga solo gli import che le servono
+
+# Le matrici del FeatureEncoder non hanno nomi di colonna, l'ordine è garantito da EXPECTED_FEATURES
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+# Tetto ai TrattoStradale tenuti nel mondo owlready2: oltre il limite i meno recenti vengono distrutti.
+# Deve superare il batch più grande ragionato in una volta (SAFEDRIVE_MAX_INDIVIDUI)
+MAX_INDIVIDUI = int(os.environ.get("SAFEDRIVE_MAX_INDIVIDUI", 100_000))
+
+# TrattoStradale creati da popola_ontologia_SafeDrive, dal meno al più recente
+_individui_vivi = OrderedDict()
+
+@lru_cache(maxsize=None)
+def mappe_ontologia():
+    """Costruisce l'ontologia al primo uso e restituisce le mappe valore del dataset -> individuo"""
+    import onto.carica_ontologia as owl_onto
+    return {
+        "road_type": {
+            'highway': owl_onto.Autostrada,
+            'urban': owl_onto.Urbana,
+            'rural': owl_onto.Rurale,
+        },
+        "lighting": {
+            "night": owl_onto.Notturno,
+            "dim": owl_onto.Penombra,
+            "day": owl_onto.Diurno,
+        },
+        "weather": {
+            "clear": owl_onto.Sole,
+            "rainy": owl_onto.Pioggia,
+            "foggy": owl_onto.Nebbia,
+        },
+        "time_of_day": {
+            "morning": owl_onto.Mattina,
+            "afternoon": owl_onto.Pomeriggio,
+            "evening": owl_onto.Sera,
+        },
+    }
+
+def __getattr__(nome):
+    """Accesso pigro ai nomi che il modulo esponeva importando tutto all'avvio"""
+    if nome in ("road_type", "lighting", "weather", "time_of_day"):
+        return mappe_ontologia()[nome]
+    if nome == "owl_onto":
+        import onto.carica_ontologia as owl_onto
+        return owl_onto
+    if nome == "my_ontology":
+        from onto.carica_ontologia import onto as my_ontology
+        return my_ontology
+    if nome in ("EXPECTED_FEATURES", "FeatureEncoder"):
+        import data.feature_encoder as feature_encoder
+        return getattr(feature_encoder, nome)
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
 def carica_dataset(path):
+    import pandas as pd
     try:
         df = pd.read_csv(path)
         print(f"📊 Dataset caricato con successo: {df.shape[0]} righe e {df.shape[1]} colonne.")
@@ -41,30 +67,24 @@ def carica_dataset(path):
     except FileNotFoundError:
         print("❌ Errore: File non tråovato. Controlla il percorso del file.")
         return None
-    
-EXPECTED_FEATURES = [
-    "num_lanes",
-    "curvature",
-    "speed_limit",
-    "road_signs_present",
-    "public_road",
-    "holiday",
-    "school_season",
-    "road_type_highway",
-    "road_type_rural",
-    "road_type_urban",
-    "weather_clear",
-    "weather_foggy",
-    "weather_rainy",
-    "time_of_day_afternoon",
-    "time_of_day_evening",
-    "time_of_day_morning",
-    "lighting_daylight",
-    "lighting_dim",
-    "lighting_night",
-]
-
-def preprocessa_dataset(dfo, add_scaler=False):
+
+def carica_dataset_a_blocchi(path, dimensione_blocco=50_000):
+    """Legge il csv a blocchi di dimensione_blocco righe, senza caricarlo tutto in memoria"""
+    import pandas as pd
+    try:
+        yield from pd.read_csv(path, chunksize=dimensione_blocco)
+    except FileNotFoundError:
+        print("❌ Errore: File non trovato. Controlla il percorso del file.")
+
+
+def preprocessa_dataset(dfo, add_scaler=False, scaler=None):
+    """
+    scaler : StandardScaler già allenato da riusare; se assente e add_scaler è True
+    ne viene allenato uno nuovo sul dataset stesso
+    """
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
+    from data.feature_encoder import EXPECTED_FEATURES
     df=dfo.copy()
     if df is not None:
         df['speed_limit'] = df['speed_limit'] * 1.60934
@@ -81,19 +101,21 @@ def preprocessa_dataset(dfo, add_scaler=False):
                 df[col]=0
         df = df[EXPECTED_FEATURES]
         if add_scaler:
-            scaler = StandardScaler()
-
             numeric_features = ['speed_limit', 'curvature', 'lane_width'] # Aggiungi altre se presenti
 
             # Verifichiamo che le colonne esistano prima di scalare
             existing_numeric = [c for c in numeric_features if c in df.columns]
-            df[existing_numeric] = scaler.fit_transform(df[existing_numeric])
+            if scaler is None:
+                scaler = StandardScaler().fit(df[existing_numeric])
+            df[existing_numeric] = scaler.transform(df[existing_numeric])
         return df
     else:
         return None
     
 
 def preprocessa_salva_dataset(df, name = 'dataset'):
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
     if df is not None:
         df['speed_limit'] = df['speed_limit'] * 1.60934
         print("✅ Speed limit convertito da mph a km/h")
@@ -116,9 +138,53 @@ def preprocessa_salva_dataset(df, name = 'dataset'):
         print(f"✅ Scaling completato su: {existing_numeric}")
         df.to_csv(f'data/{name}_classifier_processed.csv', index=False)
 
-def carica_modello(path):
+def codifica_dataset(segmenti_stradali, encoder=None, add_scaler=False):
+    """Usa l'encoder congelato del modello se disponibile, altrimenti preprocessa_dataset"""
+    if encoder is not None:
+        return encoder.trasforma(segmenti_stradali)
+    return preprocessa_dataset(segmenti_stradali, add_scaler=add_scaler)
+
+def carica_encoder(path_modello):
+    """FeatureEncoder salvato accanto al modello (None se non è stato costruito)"""
+    from data.feature_encoder import carica_encoder
+    return carica_encoder(path_modello)
+
+def carica_encoder_congelati(path_classificazione, path_regressione, riferimento=None):
+    """
+    Encoder di training dei due modelli, per i processi che non devono allenare niente sui dati in arrivo
+    (worker e server). Il regressore non scala e senza encoder usa il FeatureEncoder di default.
+    riferimento : segmenti su cui allenare una sola volta lo scaler del classificatore se il suo encoder
+    non è stato costruito, con un avviso; senza riferimento l'encoder mancante solleva FileNotFoundError
+    """
+    from data.feature_encoder import FeatureEncoder, percorso_encoder
+    encoder_classificazione = carica_encoder(path_classificazione)
+    if encoder_classificazione is None:
+        costruzione = (f"Encoder del classificatore {percorso_encoder(path_classificazione)} non trovato: "
+                       f"costruiscilo una volta sola con python -m data.feature_encoder <csv di training>")
+        if riferimento is None:
+            raise FileNotFoundError(costruzione)
+        print(f"⚠️ {costruzione}. Intanto lo scaler viene allenato una volta sola su {len(riferimento)} "
+              f"segmenti di riferimento")
+        encoder_classificazione = FeatureEncoder(scala=True).fit(riferimento)
+    return encoder_classificazione, carica_encoder(path_regressione) or FeatureEncoder()
+
+def carica_modello(path, mmap=False):
+    """
+    mmap : se True usa la foresta piatta memory-mapped salvata accanto al pickle
+    (models/foresta_piatta.py), condivisa tra i processi tramite la page cache;
+    se non esiste apre il pickle con joblib in mmap_mode='r'
+    """
+    import joblib
     try:
-        modello = joblib.load(path)
+        if mmap:
+            from models.foresta_piatta import ForestaPiatta, percorso_foresta_piatta
+            if os.path.isdir(percorso_foresta_piatta(path)):
+                modello = ForestaPiatta.carica(percorso_foresta_piatta(path))
+                print(f"📁 Foresta piatta mappata in memoria da {percorso_foresta_piatta(path)}")
+                return modello
+            modello = joblib.load(path, mmap_mode="r")
+        else:
+            modello = joblib.load(path)
         print(f"📁 Modello caricato con successo da {path}")
         return modello
     except FileNotFoundError:
@@ -133,17 +199,46 @@ def predizione(modello, X):
         print("❌ Errore: Modello o dataset non disponibile per la predizione.")
         return None
 
+def valuta_segmenti(segmenti_stradali, modello_classificazione, modello_regressione,
+                    encoder_classificazione=None, encoder_regressione=None):
+    """
+    segmenti_stradali : dataframe di road_system.csv non processato
+    Preprocessa il dataset una sola volta e invoca ogni modello su tutto il batch,
+    invece di una predizione per riga. Restituisce un dataframe colonnare
+    (stesso indice dell'input) con le predizioni di entrambi i modelli.
+    encoder_* : FeatureEncoder salvati accanto ai modelli (carica_encoder), se disponibili
+    """
+    import pandas as pd
+    X_class = codifica_dataset(segmenti_stradali, encoder_classificazione, add_scaler=True)
+    X_reg = codifica_dataset(segmenti_stradali, encoder_regressione) #il regressore è stato allenato sui dati non scalati
+
+    valutazioni = pd.DataFrame({"id": segmenti_stradali["id"].to_numpy()}, index=segmenti_stradali.index)
+    valutazioni["pericolo"] = predizione(modello_classificazione, X_class)
+    valutazioni["probabilità_pericolo"] = modello_classificazione.predict_proba(X_class)[:, 1]
+    valutazioni["punteggio_pericolo"] = predizione(modello_regressione, X_reg)
+    return valutazioni
+
+def valuta_segmenti_con_tabella(segmenti_stradali, tabella, modello_classificazione, modello_regressione,
+                                encoder_classificazione=None, encoder_regressione=None):
+    """
+    Come valuta_segmenti, ma legge le predizioni dalla tabella precalcolata (models/tabella_rischio.py):
+    i modelli vengono invocati solo per i segmenti fuori dalla griglia della tabella.
+    """
+    valutazioni = tabella.valuta(segmenti_stradali, ripiego=lambda fuori: valuta_segmenti(
+        fuori, modello_classificazione, modello_regressione, encoder_classificazione, encoder_regressione))
+    return valutazioni.drop(columns="in_tabella")
+
 def popola_ontologia_SafeDrive(record, predizione_classificazione, predizione_regressione):
+    import onto.carica_ontologia as owl_onto
 
     te = owl_onto.TrattoStradale(f"TrattoStradale_{record['id']}")
-    if record['road_type'] in road_type:
-        te.haTipoStrada = road_type.get(record['road_type'])
-    
-    if record['weather'] in weather:
-        te.haCondizioniMeteo = weather.get(record['weather'])
+    mappe = mappe_ontologia()
+    road_type, weather, lighting = mappe["road_type"], mappe["weather"], mappe["lighting"]
 
-    if record['lighting'] in lighting:
-        te.haIlluminazione = lighting.get(record['lighting'])
+    #None se il valore non è mappato: aggiornando un tratto esistente si cancella anche il valore precedente
+    te.haTipoStrada = road_type.get(record['road_type'])
+    te.haCondizioniMeteo = weather.get(record['weather'])
+    te.haIlluminazione = lighting.get(record['lighting'])
 
     #if record['time_of_day'] in time_of_day:
         #te.haMomentoGiorno = time_of_day.get(record['time_of_day'])
@@ -155,47 +250,279 @@ def popola_ontologia_SafeDrive(record, predizione_classificazione, predizione_re
     te.haPericolo = int(predizione_classificazione) 
     te.haPunteggioPericolo = float(predizione_regressione)
 
+    _registra_individuo(te)
     return te
 
+def popola_segmenti_SafeDrive(segmenti_stradali, valutazioni):
+    """
+    Come popola_ontologia_SafeDrive per ogni segmento, ma scrive tutte le triple del batch
+    in blocco nel quadstore (onto/popolamento_massivo.py) invece di un'assegnazione per proprietà.
+    Restituisce gli individui, nell'ordine dei segmenti.
+    """
+    import onto.carica_ontologia as owl_onto
+    from onto.popolamento_massivo import popola_in_blocco
+    nomi = [f"TrattoStradale_{id}" for id in segmenti_stradali["id"]]
+    individui = popola_in_blocco(frame_ontologia(segmenti_stradali, valutazioni), owl_onto.onto, nomi)
+    for te in individui:
+        _registra_individuo(te)
+    return individui
+
+def _registra_individuo(te):
+    _individui_vivi[te.name] = te
+    _individui_vivi.move_to_end(te.name)
+    while len(_individui_vivi) > MAX_INDIVIDUI:
+        _, vecchio = _individui_vivi.popitem(last=False)
+        _distruggi(vecchio)
+
+def _distruggi(te):
+    from owlready2 import destroy_entity
+    if ragionatore_incrementale.cache_info().currsize:
+        ragionatore_incrementale().sporchi.discard(te)
+    if pellet_persistente.cache_info().currsize:
+        pellet_persistente().dimentica([te])
+    destroy_entity(te)
+
+def rilascia_individui(individui):
+    """Distrugge i TrattoStradale di un batch già elaborato, liberando il mondo owlready2"""
+    for te in individui:
+        _individui_vivi.pop(te.name, None)
+        _distruggi(te)
+
+def individui_caricati():
+    """Numero di TrattoStradale attualmente presenti nell'ontologia"""
+    import onto.carica_ontologia as owl_onto
+    return sum(1 for _ in owl_onto.TrattoStradale.instances())
+
+def salva_quadstore():
+    """Con SAFEDRIVE_QUADSTORE il mondo è su disco: conferma le modifiche nel file SQLite"""
+    from owlready2 import default_world
+    if default_world.filename != ":memory:":
+        default_world.save()
+
 def ragiona_ontologia_SafeDrive(te):
+    from owlready2 import sync_reasoner_pellet
+    from onto.carica_ontologia import onto as my_ontology
     with my_ontology:
         sync_reasoner_pellet(infer_property_values=True, infer_data_property_values=True, debug = 0)
 
     return te
 
-def stampa_conclusioni_ontologia_SafeDrive(t_ontology):
+@lru_cache(maxsize=None)
+def pellet_persistente():
+    """JVM di Pellet persistente (onto/pellet_persistente.py), avviata al primo ragionamento del processo"""
+    import onto.carica_ontologia as owl_onto
+    from onto.pellet_persistente import PelletPersistente
+    return PelletPersistente(owl_onto.onto)
 
-    ROSSO = "\033[31m"
-    RESET = "\033[0m"
+def ragiona_segmenti_SafeDrive(segmenti_stradali, valutazioni, persistente=False):
+    """
+    segmenti_stradali : dataframe non processato, valutazioni : dataframe di valuta_segmenti
+    Popola prima tutti i TrattoStradale (in blocco, popola_segmenti_SafeDrive), poi esegue il ragionatore
+    UNA sola volta per l'intero batch (invece di un sync_reasoner_pellet per segmento sull'ontologia
+    che continua a crescere).
+    Restituisce gli individui, nell'ordine dei segmenti, con haStatoSicurezza / haTipoRischio /
+    haRaccomandazione già inferiti.
+    persistente : se True ragiona con la JVM di Pellet persistente, inviando solo questi individui
+    """
+    individui = popola_segmenti_SafeDrive(segmenti_stradali, valutazioni)
+    if persistente:
+        return pellet_persistente().ragiona(individui)
+    return ragiona_ontologia_SafeDrive(individui)
+
+def frame_ontologia(segmenti_stradali, valutazioni):
+    """Gli stessi fatti di popola_ontologia_SafeDrive, come frame colonnare per onto/motore_regole.py"""
+    import pandas as pd
+    mappe = mappe_ontologia()
+    frame = pd.DataFrame(index=segmenti_stradali.index)
+    for colonna, proprietà in (("road_type", "haTipoStrada"), ("weather", "haCondizioniMeteo"),
+                               ("lighting", "haIlluminazione")):
+        frame[proprietà] = segmenti_stradali[colonna].map({k: v.name for k, v in mappe[colonna].items()})
+    frame["haCurvatura"] = segmenti_stradali["curvature"].astype(float)
+    frame["haLimiteVelocità"] = (segmenti_stradali["speed_limit"] * 1.60934).astype(int)
+    frame["haSegnaletica"] = segmenti_stradali["road_signs_present"].astype(int)
+    frame["haPericolo"] = valutazioni["pericolo"].astype(int)
+    frame["haPunteggioPericolo"] = valutazioni["punteggio_pericolo"].astype(float)
+    return frame
+
+@lru_cache(maxsize=None)
+def motore_regole():
+    """Motore di regole nativo costruito dalle regole SWRL dell'ontologia, al primo uso"""
+    from onto.motore_regole import MotoreRegole
+    return MotoreRegole()
+
+def conclusioni_native(segmenti_stradali, valutazioni):
+    """
+    Come ragiona_segmenti_SafeDrive + estrai_conclusioni, ma valuta le regole dell'ontologia
+    con il motore NumPy (onto/motore_regole.py): niente Pellet e niente individui da creare
+    """
+    return motore_regole().conclusioni(frame_ontologia(segmenti_stradali, valutazioni))
+
+@lru_cache(maxsize=None)
+def regole_compilate():
+    """Modulo onto/regole_compilate.py (errore se l'ontologia è cambiata: python -m onto.compilatore_regole)"""
+    from onto.compilatore_regole import carica_regole_compilate
+    return carica_regole_compilate()
+
+@lru_cache(maxsize=None)
+def memoria_conclusioni():
+    """Conclusioni memorizzate per firma (onto/firme_regole.py), condivise da tutti i batch del processo"""
+    from onto.firme_regole import MemoriaConclusioni
+    return MemoriaConclusioni(motore_regole())
+
+@lru_cache(maxsize=None)
+def mondi_isolati():
+    """
+    Un World owlready2 con il suo Pellet per processo worker (onto/mondi_isolati.py), SAFEDRIVE_MONDI mondi;
+    il pool dei worker viene chiuso all'uscita del processo
+    """
+    import atexit
+    from onto.mondi_isolati import RagionatoreMondi
+    ragionatore = RagionatoreMondi(int(os.environ.get("SAFEDRIVE_MONDI", 0)) or None)
+    atexit.register(ragionatore.chiudi)
+    return ragionatore
 
-    print(f"\n📍 Analisi: {t_ontology.name}")
-    print(f"   Input ML - Score: {ROSSO}{t_ontology.haPunteggioPericolo:.2f}{RESET}, Class: {ROSSO}{t_ontology.haPericolo}{RESET}")
-    
-    # Recuperiamo lo Stato di Sicurezza inferito
-    if t_ontology.haStatoSicurezza:
-        print(f"   🛡️ STATO RILEVATO: {t_ontology.haStatoSicurezza.name}")
-    elif t_ontology.haPericolo == 0 and t_ontology.haPunteggioPericolo > 0.5:
-        print("   🛡️ STATO RILEVATO: Conflitto tra i pedittori")
-    else:
-        print("   🛡️ STATO RILEVATO: Non determinato")
-
-    # Recuperiamo il Tipo di Rischio inferito (se presente)
-    rischi = t_ontology.haTipoRischio
-    if rischi:
-        # Essendo una lista (potrebbero esserci più rischi), li uniamo
-        nomi_rischi = ", ".join([r.name for r in rischi])
-        print(f"   ⚠️ TIPO RISCHIO: {nomi_rischi}")
-    
-    # Recuperiamo le Raccomandazioni inferite
-    raccomandazioni = t_ontology.haRaccomandazione
-    if raccomandazioni:
-        print("   💡 RACCOMANDAZIONI SISTEMA:")
-        for rac in raccomandazioni:
-            print(f"      - {rac.name}")
-    else:
-        print("      - Guida con prudenza")
+def conclusioni_segmenti(segmenti_stradali, valutazioni, ragionatore="pellet"):
+    """
+    Conclusioni dell'ontologia (come estrai_conclusioni, stesso indice dei segmenti) con il ragionatore scelto:
+    "pellet" : individui nell'ontologia e un passaggio di Pellet, poi rilasciati
+    "nativo" : motore NumPy delle regole (conclusioni_native)
+    "firme"  : Pellet una volta per firma mai vista, risultati distribuiti ai segmenti con la stessa firma
+    "compilato" : tabella di decisione generata da onto/compilatore_regole.py (rigenerata se l'ontologia cambia)
+    "persistente" : come "pellet", ma con una sola JVM per processo che riceve solo gli individui del batch
+    "mondi" : segmenti divisi tra mondi owlready2 isolati, ognuno con il suo Pellet in un processo separato
+    """
+    if ragionatore == "nativo":
+        return conclusioni_native(segmenti_stradali, valutazioni)
+    if ragionatore == "compilato":
+        return regole_compilate().conclusioni_da_tabella(frame_ontologia(segmenti_stradali, valutazioni))
+    if ragionatore == "firme":
+        return memoria_conclusioni().conclusioni(frame_ontologia(segmenti_stradali, valutazioni))
+    if ragionatore == "mondi":
+        return mondi_isolati().conclusioni(frame_ontologia(segmenti_stradali, valutazioni))
+    individui = ragiona_segmenti_SafeDrive(segmenti_stradali, valutazioni, persistente=ragionatore == "persistente")
+    conclusioni = estrai_conclusioni(individui).set_index(segmenti_stradali.index)
+    rilascia_individui(individui)
+    return conclusioni
+
+def avvia_ragionatore(ragionatore="pellet"):
+    """Prepara subito il ragionatore di conclusioni_segmenti invece che alla prima richiesta (processi residenti)"""
+    if ragionatore == "nativo":
+        motore_regole()
+    elif ragionatore == "firme":
+        memoria_conclusioni()
+    elif ragionatore == "compilato":
+        regole_compilate()
+    elif ragionatore == "persistente":
+        pellet_persistente().avvia()
+    elif ragionatore == "mondi":
+        mondi_isolati()
+
+@lru_cache(maxsize=None)
+def ragionatore_incrementale():
+    """
+    Ragionatore incrementale (onto/ragionamento_incrementale.py) condiviso da tutti gli aggiornamenti;
+    i tratti rimossi con rimosso() passano da rilascia_individui, quindi escono anche da _individui_vivi
+    """
+    from onto.ragionamento_incrementale import RagionatoreIncrementale
+    return RagionatoreIncrementale(motore_regole(), distruggi=lambda te: rilascia_individui([te]))
+
+def aggiorna_segmenti_SafeDrive(segmenti_stradali, valutazioni):
+    """
+    Aggiornamento in diretta: crea o modifica (stesso id) i TrattoStradale dei segmenti e
+    ricava di nuovo le conclusioni solo per loro e per i tratti adiacenti, senza ragionare
+    su tutta la rete. Restituisce gli individui aggiornati, nell'ordine dei segmenti.
+    """
+    ragionatore = ragionatore_incrementale()
+    individui = popola_segmenti_SafeDrive(segmenti_stradali, valutazioni)
+    for te in individui:
+        ragionatore.modificato(te)
+    ragionatore.ragiona()
+    return individui
+
+def stampa_conclusioni_ontologia_SafeDrive(t_ontology, conclusioni=None):
+    """
+    conclusioni : riga di estrai_conclusioni del tratto, altrimenti lette dagli attributi dell'individuo
+    Per molti segmenti conviene la destinazione StampaTerminale (destinazioni.py), che scrive a blocchi.
+    """
+    from destinazioni import testo_conclusioni
+    if conclusioni is None:
+        conclusioni = estrai_conclusioni([t_ontology]).iloc[0]
+
+    print(testo_conclusioni(t_ontology.name, t_ontology.haPunteggioPericolo, t_ontology.haPericolo,
+                            conclusioni["stato_sicurezza"], conclusioni["tipo_rischio"], conclusioni["raccomandazioni"]))
+
+def estrai_conclusioni(individui):
+    """
+    Conclusioni inferite per ogni individuo come dataframe colonnare (stato, rischi, raccomandazioni),
+    lette con una sola query sul quadstore (onto/estrazione_conclusioni.py)
+    """
+    return conclusioni_ontologia(individui).drop(columns="segmento")
+
+def conclusioni_ontologia(individui=None):
+    """
+    Frame (segmento, stato_sicurezza, tipo_rischio, raccomandazioni) degli individui dati,
+    di default di tutti i TrattoStradale nell'ontologia
+    """
+    from onto.carica_ontologia import onto as my_ontology
+    from onto.estrazione_conclusioni import estrai_in_blocco
+    return estrai_in_blocco(my_ontology, individui)
+
+def scrivi_csv_a_blocchi(path):
+    """Restituisce una funzione emetti che accoda i risultati di ogni blocco allo stesso csv"""
+    from destinazioni import DestinazioneCSV
+    return DestinazioneCSV(path, dimensione_flush=0)
+
+def apri_destinazioni(path, dimensione_flush=100_000, stampa=False):
+    """
+    Destinazione dei risultati scelta dall'estensione di path (.csv, .jsonl, .parquet, .sqlite, .db),
+    con il resoconto a terminale (StampaTerminale) in più se stampa. Va chiusa (o usata con with).
+    """
+    from destinazioni import apri_destinazione, Destinazioni, StampaTerminale
+    destinazione = apri_destinazione(path, dimensione_flush)
+    return Destinazioni([destinazione, StampaTerminale()]) if stampa else destinazione
+
+def elabora_a_blocchi(path, modello_classificazione, modello_regressione, emetti, dimensione_blocco=50_000,
+                      encoder_classificazione=None, encoder_regressione=None, tabella=None, ragionatore="pellet"):
+    """
+    Pipeline in streaming per file di segmenti troppo grandi per la memoria: per ogni blocco
+    codifica -> classifica -> regredisce -> ragiona con le regole dell'ontologia -> emette.
+    Gli individui del blocco vengono distrutti dopo l'emissione, così la memoria
+    (e il mondo su cui ragiona Pellet) resta limitata alla dimensione del blocco.
+    emetti : funzione che riceve il dataframe dei risultati di ogni blocco (es. una destinazione, apri_destinazioni)
+    tabella : TabellaRischio opzionale, sostituisce le chiamate ai modelli (valuta_segmenti_con_tabella)
+    ragionatore : "pellet", "nativo", "firme", "compilato", "persistente" o "mondi" (conclusioni_segmenti)
+    encoder_* : FeatureEncoder dei modelli; senza quello del classificatore lo scaler viene allenato
+    una sola volta su tutto il file (una lettura in più) e usato per ogni blocco, così i risultati
+    non dipendono da dimensione_blocco
+    Restituisce il numero di segmenti elaborati.
+    """
+    import pandas as pd
+    from data.feature_encoder import FeatureEncoder
+    if encoder_classificazione is None:
+        print("⚠️ Encoder del classificatore non trovato (python -m data.feature_encoder <csv di training>): "
+              "lo scaler viene allenato una sola volta su tutto l'input")
+        encoder_classificazione = FeatureEncoder(scala=True).fit_a_blocchi(carica_dataset_a_blocchi(path, dimensione_blocco))
+    if encoder_regressione is None:
+        encoder_regressione = FeatureEncoder() #il regressore non scala: non c'è niente da allenare
+    elaborati = 0
+    for blocco in carica_dataset_a_blocchi(path, dimensione_blocco):
+        if tabella is not None:
+            valutazioni = valuta_segmenti_con_tabella(blocco, tabella, modello_classificazione, modello_regressione,
+                                                      encoder_classificazione, encoder_regressione)
+        else:
+            valutazioni = valuta_segmenti(blocco, modello_classificazione, modello_regressione,
+                                          encoder_classificazione, encoder_regressione)
+
+        conclusioni = conclusioni_segmenti(blocco, valutazioni, ragionatore) #un solo passaggio del ragionatore per blocco
+        emetti(pd.concat([valutazioni, conclusioni], axis=1))
+        salva_quadstore()
+        elaborati += len(blocco)
+        print(f"✅ Segmenti elaborati: {elaborati}")
+    return elaborati
 
 def costruisci_risolvi_CSP(segmenti_stradali):
+    from csp.road_plannerCSP import csp_builder
+    from csp.cspSoft import DF_branch_and_bound_opt
     limiti = []
     for s in segmenti_stradali.itertuples():
         limiti.append(s.speed_limit)
@@ -209,53 +536,206 @@ def costruisci_risolvi_CSP(segmenti_stradali):
 
     if soluzione:
         # Estraiamo solo i VALORI delle velocità in ordine di segmento
-        return [soluzione[var] for var in sorted(soluzione.keys(), key=lambda x: x.name)]
+        return [soluzione[var] for var in sorted(soluzione.keys(), key=lambda x: int(x.name.split("_")[1]))]
     return None
 
-def messa_in_sicurezza(segmenti_stradali, modello_classificazione):
+PASSO_RIDUZIONE = 10
+VELOCITÀ_MINIMA = 30 #guardrail: sotto questa soglia non si scende
+
+def limiti_sicuri(segmenti_stradali, modello_classificazione, encoder=None):
+    """
+    segmenti_stradali : dataframe di road_system.csv non processato
+    Costruisce la griglia segmento x velocità candidata (limite attuale, poi a passi
+    di 10 fino al guardrail) e la valuta con una sola predict_proba.
+    Per ogni segmento restituisce la velocità più alta giudicata sicura dal classificatore,
+    oppure quella del guardrail se nessuna candidata lo è.
+    encoder : FeatureEncoder del classificatore; se presente i segmenti vengono codificati
+    una sola volta e nella griglia cambia solo la colonna della velocità
+    """
+    import numpy as np
+    from sklearn.preprocessing import StandardScaler
+    from data.feature_encoder import EXPECTED_FEATURES, FeatureEncoder
+    limiti = segmenti_stradali['speed_limit'].to_numpy()
+
+    # Passi necessari a raggiungere il guardrail: il limite del guardrail non viene valutato
+    passi = np.maximum(np.ceil((limiti - VELOCITÀ_MINIMA) / PASSO_RIDUZIONE).astype(int), 1)
+    candidati = limiti[:, None] - PASSO_RIDUZIONE * np.arange(passi.max())
+    da_valutare = np.arange(passi.max()) < passi[:, None]
+
+    if encoder is not None:
+        X_griglia = np.repeat(encoder.trasforma(segmenti_stradali), passi, axis=0)
+        X_griglia[:, EXPECTED_FEATURES.index('speed_limit')] = encoder.scala_colonna(
+            'speed_limit', FeatureEncoder.valori_numerici({'speed_limit': candidati[da_valutare]}, 'speed_limit'))
+    else:
+        # Lo scaler è quello del batch originale, come per la valutazione dei segmenti stessi
+        scaler = StandardScaler().fit(preprocessa_dataset(segmenti_stradali)[['speed_limit', 'curvature']])
+        griglia = segmenti_stradali.loc[segmenti_stradali.index.repeat(passi)].copy()
+        griglia['speed_limit'] = candidati[da_valutare]
+        X_griglia = preprocessa_dataset(griglia, add_scaler=True, scaler=scaler)
+
+    probabilità = modello_classificazione.predict_proba(X_griglia)
+    sicuro = np.zeros(candidati.shape, dtype=bool)
+    sicuro[da_valutare] = modello_classificazione.classes_[np.argmax(probabilità, axis=1)] == 0
+
+    # Le candidate sono in ordine decrescente: argmax trova la prima (la più alta) sicura
+    prima_sicura = np.argmax(sicuro, axis=1)
+    return np.where(sicuro.any(axis=1),
+                    candidati[np.arange(len(limiti)), prima_sicura],
+                    limiti - PASSO_RIDUZIONE * passi)
+
+def messa_in_sicurezza(segmenti_stradali, modello_classificazione, vettorizzata=True, encoder=None):
     """
     segmanti_stradali : dataframe di road_system.csv non processato
     Modifica il DATAFRAME se il modello ML predice un rischio (classe 1)
     e poi ottimizza con il CSP.
+    vettorizzata : se True valuta tutte le velocità candidate in un solo passaggio (limiti_sicuri),
+    altrimenti riduce la velocità segmento per segmento
     """
-    segmento = preprocessa_dataset(segmenti_stradali, add_scaler=True)
+    from sklearn.preprocessing import StandardScaler
+    if vettorizzata:
+        nuovi_limiti = limiti_sicuri(segmenti_stradali, modello_classificazione, encoder)
+        ridotti = int((nuovi_limiti < segmenti_stradali['speed_limit'].to_numpy()).sum())
+        print(f"PERICOLO rilevato dal classificatore su {ridotti} segmenti, velocità ridotta")
+        segmenti_stradali['speed_limit'] = nuovi_limiti
+        return costruisci_risolvi_CSP(segmenti_stradali)
+
+    scaler = StandardScaler().fit(preprocessa_dataset(segmenti_stradali)[['speed_limit', 'curvature']])
     
     # Usiamo l'indice per poter modificare il DataFrame originale
     for i in segmenti_stradali.index:
         while True:
             
-
-            if predizione(modello_classificazione, segmento)[i] == 0:
+            # Il segmento va riprocessato ad ogni riduzione della velocità
+            segmento = preprocessa_dataset(segmenti_stradali.loc[[i]], add_scaler=True, scaler=scaler)
+            if predizione(modello_classificazione, segmento)[0] == 0:
                 print(f"nessun PERICOLO rilevato dal classificatore sul segmento {i}")
                 break 
 
             print(f"PERICOLO rilevato dal classificatore sul segmento {i}, riduzione velocità")
             
-            segmenti_stradali.at[i, 'speed_limit'] -= 10
+            segmenti_stradali.at[i, 'speed_limit'] -= PASSO_RIDUZIONE
             
             # Guardrail
-            if segmenti_stradali.at[i, 'speed_limit'] <= 30:
+            if segmenti_stradali.at[i, 'speed_limit'] <= VELOCITÀ_MINIMA:
                 print(f"Velocità ridotta al minimo per il segmento {i}")
                 break
         
     return costruisci_risolvi_CSP(segmenti_stradali)
      
+COLONNA_CORRIDOIO = "road_id" #segmenti con lo stesso valore appartengono allo stesso corridoio
+
+def con_cache(modello, dimensione_cache):
+    """Avvolge il modello in una cache LRU delle predizioni (models/cache_predizioni.py) se dimensione_cache > 0"""
+    if modello is None or not dimensione_cache:
+        return modello
+    from models.cache_predizioni import CachePredizioni
+    return CachePredizioni(modello, dimensione_cache)
+
+def carica_modelli(path_classificazione, path_regressione, mmap=False, path_tabella=None, dimensione_cache=0,
+                   encoder=None):
+    """
+    Modelli ed encoder di classificazione e regressione in un unico dizionario.
+    path_tabella : tabella del rischio precalcolata (models/tabella_rischio.py) da usare al posto dei modelli
+    dimensione_cache : righe memorizzate dalla cache LRU davanti a ciascun modello (0 = nessuna cache)
+    encoder : coppia (classificazione, regressione) già caricata, di default carica_encoder_congelati
+    """
+    encoder_classificazione, encoder_regressione = encoder or carica_encoder_congelati(path_classificazione,
+                                                                                        path_regressione)
+    tabella = None
+    if path_tabella is not None:
+        from models.tabella_rischio import TabellaRischio
+        tabella = TabellaRischio.carica(path_tabella)
+    return {
+        "classificazione": con_cache(carica_modello(path_classificazione, mmap), dimensione_cache),
+        "regressione": con_cache(carica_modello(path_regressione, mmap), dimensione_cache),
+        "encoder_classificazione": encoder_classificazione,
+        "encoder_regressione": encoder_regressione,
+        "tabella": tabella,
+    }
+
+def elabora_segmenti(segmenti_stradali, modelli, pianifica=True, ragionatore="pellet"):
+    """
+    segmenti_stradali : dataframe non processato dei segmenti di un solo corridoio stradale
+    modelli : dizionario restituito da carica_modelli
+    ragionatore : "pellet", "nativo", "firme", "compilato", "persistente" o "mondi" (conclusioni_segmenti)
+    Catena completa predizione -> ragionamento -> CSP (se pianifica) su un batch di segmenti.
+    Restituisce i risultati per segmento e la lista dei nuovi limiti (None se non pianifica).
+    """
+    import pandas as pd
+    modelli_encoder = (modelli["classificazione"], modelli["regressione"],
+                       modelli["encoder_classificazione"], modelli["encoder_regressione"])
+    if modelli.get("tabella") is not None:
+        valutazioni = valuta_segmenti_con_tabella(segmenti_stradali, modelli["tabella"], *modelli_encoder)
+    else:
+        valutazioni = valuta_segmenti(segmenti_stradali, *modelli_encoder)
+
+    conclusioni = conclusioni_segmenti(segmenti_stradali, valutazioni, ragionatore)
+
+    limiti = None
+    if pianifica:
+        limiti = messa_in_sicurezza(segmenti_stradali.copy(), modelli["classificazione"],
+                                    encoder=modelli["encoder_classificazione"])
+    return pd.concat([valutazioni, conclusioni], axis=1), limiti
+
+# Modelli ed encoder del processo worker, caricati una volta sola da _inizializza_worker
+_modelli_worker = {}
+
+def _inizializza_worker(path_classificazione, path_regressione, mmap, path_tabella=None, dimensione_cache=0,
+                        encoder=None):
+    _modelli_worker.update(carica_modelli(path_classificazione, path_regressione, mmap, path_tabella, dimensione_cache,
+                                          encoder))
+
+def elabora_corridoio(corridoio, ragionatore="pellet"):
+    """Esegue elabora_segmenti su un corridoio dentro un processo worker"""
+    risultati, limiti = elabora_segmenti(corridoio, _modelli_worker, ragionatore=ragionatore)
+    risultati["nuovo_limite"] = limiti
+    return risultati
+
+def elabora_in_parallelo(segmenti_stradali, path_classificazione, path_regressione, workers,
+                         colonna_corridoio=COLONNA_CORRIDOIO, mmap=False, path_tabella=None,
+                         dimensione_cache=0, ragionatore="pellet"):
+    """
+    segmenti_stradali : dataframe di road_system.csv non processato
+    Divide l'input per corridoio (colonna_corridoio; senza di essa l'input è un unico corridoio)
+    ed esegue elabora_corridoio su un pool di workers processi, ognuno con i propri modelli
+    e la propria ontologia. I risultati tornano nell'ordine dell'input.
+    mmap : i worker condividono i modelli memory-mapped invece di caricarne una copia ciascuno
+    path_tabella : tabella del rischio precalcolata usata dai worker al posto dei modelli
+    dimensione_cache : cache LRU delle predizioni di ogni worker (condivisa tra i corridoi che elabora)
+    ragionatore : "pellet", "nativo", "firme", "compilato", "persistente" o "mondi" (conclusioni_segmenti)
+    Gli encoder di training vengono caricati qui una volta sola e spediti a ogni worker; senza quello
+    del classificatore lo scaler viene allenato una volta sola su tutto l'input (come elabora_a_blocchi),
+    mai corridoio per corridoio.
+    """
+    import pandas as pd
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+    encoder = carica_encoder_congelati(path_classificazione, path_regressione, riferimento=segmenti_stradali)
+    if colonna_corridoio in segmenti_stradali.columns:
+        corridoi = [c for _, c in segmenti_stradali.groupby(colonna_corridoio, sort=False)]
+    else:
+        corridoi = [segmenti_stradali]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inizializza_worker,
+                             initargs=(path_classificazione, path_regressione, mmap, path_tabella,
+                                       dimensione_cache, encoder)) as pool:
+        risultati = list(pool.map(partial(elabora_corridoio, ragionatore=ragionatore), corridoi,
+                                  chunksize=max(1, len(corridoi) // (4 * workers))))
+
+    return pd.concat(risultati).loc[segmenti_stradali.index]
+
 if __name__ == "__main__":
-    #preprocessa_dataset(carica_dataset('data/test.csv'), True)
-    X_class = carica_dataset('data/test_classifier_processed.csv')
-    X_reg = carica_dataset('data/test_regressor_processed.csv')
     modello_classificazione = carica_modello('models/logistic_regression_model.pkl')
     modello_regressione = carica_modello('models/random_forest_model.pkl')
 
-    data = carica_dataset('data/test.csv')
-    for i in range(len(X_class.iloc[350:650])):
-        predizione_classificazione = predizione(modello_classificazione, X_class.iloc[[i]])
-        predizione_regressione = predizione(modello_regressione, X_reg.iloc[[i]])
-        if predizione_regressione[0] >= 0.5:
-            print(f"{predizione_classificazione[0]}, {predizione_regressione[0]:.2f}")
-            print(data.iloc[[i]])
-            x = popola_ontologia_SafeDrive(data.iloc[i], predizione_classificazione[0], predizione_regressione[0])
-            ragiona_ontologia_SafeDrive(x)
-            stampa_conclusioni_ontologia_SafeDrive(x)
+    data = carica_dataset('data/test.csv').iloc[350:650]
+    valutazioni = valuta_segmenti(data, modello_classificazione, modello_regressione)
+    pericolosi = valutazioni["punteggio_pericolo"] >= 0.5
+    individui = ragiona_segmenti_SafeDrive(data[pericolosi], valutazioni[pericolosi]) #un solo passaggio del ragionatore
+    conclusioni = estrai_conclusioni(individui).set_index(data.index[pericolosi]) #una sola query
+    for (i, v), x in zip(valutazioni[pericolosi].iterrows(), individui):
+        print(f"{v['pericolo']}, {v['punteggio_pericolo']:.2f}")
+        print(data.loc[[i]])
+        stampa_conclusioni_ontologia_SafeDrive(x, conclusioni.loc[i])
     
-    print(messa_in_sicurezza(carica_dataset("data/road_system.csv")))
\ No newline at end of file
+    print(messa_in_sicurezza(carica_dataset("data/road_system.csv"), modello_classificazione))
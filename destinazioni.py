@@ -0,0 +1,251 @@
+"""Destinazioni dei risultati: file strutturati scritti a blocchi invece di una print per segmento.
+
+Ogni destinazione riceve i dataframe dei risultati (valutazioni + conclusioni, come
+elabora_a_blocchi ed elabora_in_parallelo) e li accumula finché le righe in attesa non
+raggiungono dimensione_flush; solo allora li scrive con una sola operazione colonnare.
+Con dimensione_flush=0 ogni dataframe viene scritto subito. chiudi() (o il blocco with)
+scrive le righe rimaste.
+
+    .csv              DestinazioneCSV      rischi e raccomandazioni separati da ';'
+    .jsonl            DestinazioneJSONL    un oggetto JSON per riga, liste come array
+    .parquet          DestinazioneParquet  un row group per flush (richiede pyarrow)
+    .sqlite / .db     DestinazioneSQLite   tabella "risultati", una transazione per flush
+    StampaTerminale   il resoconto colorato per segmento, solo su richiesta (main.py --stampa)
+
+Le destinazioni sono chiamabili, quindi si passano direttamente come emetti a elabora_a_blocchi.
+
+Prestazioni su un milione di segmenti sintetici (dalla radice del repository):
+    python destinazioni.py 1000000
+"""
+
+import os
+import sys
+import pandas as pd
+from abc import ABC, abstractmethod
+
+ROSSO = "\033[31m"
+RESET = "\033[0m"
+
+COLONNE_LISTA = ("tipo_rischio", "raccomandazioni")
+
+def testo_conclusioni(nome, punteggio, pericolo, stato, rischi, raccomandazioni):
+    """Resoconto leggibile di un tratto (il testo di stampa_conclusioni_ontologia_SafeDrive)"""
+    righe = [f"\n📍 Analisi: {nome}",
+             f"   Input ML - Score: {ROSSO}{punteggio:.2f}{RESET}, Class: {ROSSO}{pericolo}{RESET}"]
+
+    if pd.notna(stato):
+        righe.append(f"   🛡️ STATO RILEVATO: {stato}")
+    elif pericolo == 0 and punteggio > 0.5:
+        righe.append("   🛡️ STATO RILEVATO: Conflitto tra i pedittori")
+    else:
+        righe.append("   🛡️ STATO RILEVATO: Non determinato")
+
+    if len(rischi):
+        righe.append(f"   ⚠️ TIPO RISCHIO: {', '.join(rischi)}")
+
+    if len(raccomandazioni):
+        righe.append("   💡 RACCOMANDAZIONI SISTEMA:")
+        righe += [f"      - {rac}" for rac in raccomandazioni]
+    else:
+        righe.append("      - Guida con prudenza")
+    return "\n".join(righe)
+
+def _unisci_liste(risultati):
+    """Rischi e raccomandazioni come testo separato da ';', per i formati senza liste"""
+    return risultati.assign(**{c: risultati[c].str.join(";") for c in COLONNE_LISTA if c in risultati.columns})
+
+class Destinazione(ABC):
+    """Accumula i risultati e li scrive a blocchi di almeno dimensione_flush righe; le sottoclassi definiscono _scrivi"""
+
+    def __init__(self, dimensione_flush=100_000):
+        self.dimensione_flush = dimensione_flush
+        self.in_attesa = []
+        self.righe_in_attesa = 0
+        self.scritte = 0
+
+    def scrivi(self, risultati):
+        self.in_attesa.append(risultati)
+        self.righe_in_attesa += len(risultati)
+        if self.righe_in_attesa >= self.dimensione_flush:
+            self.svuota()
+
+    __call__ = scrivi
+
+    def svuota(self):
+        if not self.in_attesa:
+            return
+        risultati = self.in_attesa[0] if len(self.in_attesa) == 1 else pd.concat(self.in_attesa)
+        self._scrivi(risultati, primo=self.scritte == 0)
+        self.scritte += len(risultati)
+        self.in_attesa, self.righe_in_attesa = [], 0
+
+    def chiudi(self):
+        self.svuota()
+        self._chiudi()
+
+    @abstractmethod
+    def _scrivi(self, risultati, primo):
+        """Scrive un blocco di risultati (primo: è il primo blocco della destinazione)"""
+
+    def _chiudi(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *eccezione):
+        self.chiudi()
+
+class DestinazioneCSV(Destinazione):
+
+    def __init__(self, path, dimensione_flush=100_000):
+        super().__init__(dimensione_flush)
+        self.path = path
+
+    def _scrivi(self, risultati, primo):
+        _unisci_liste(risultati).to_csv(self.path, mode="w" if primo else "a", header=primo, index=False)
+
+class DestinazioneJSONL(Destinazione):
+
+    def __init__(self, path, dimensione_flush=100_000):
+        super().__init__(dimensione_flush)
+        self.path = path
+
+    def _scrivi(self, risultati, primo):
+        with open(self.path, "w" if primo else "a", encoding="utf-8") as f:
+            f.write(risultati.to_json(orient="records", lines=True, force_ascii=False, double_precision=15))
+
+class DestinazioneParquet(Destinazione):
+
+    def __init__(self, path, dimensione_flush=100_000):
+        super().__init__(dimensione_flush)
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError("Per scrivere in Parquet serve pyarrow: pip install pyarrow") from None
+        self.path = path
+        self.scrittore = None
+
+    def _schema(self, risultati):
+        """Schema del primo blocco, con tipi fissi per le colonne che in un blocco possono essere tutte vuote"""
+        import pyarrow as pa
+        schema = pa.Schema.from_pandas(risultati, preserve_index=False)
+        for i, campo in enumerate(schema):
+            if campo.name in COLONNE_LISTA:
+                schema = schema.set(i, pa.field(campo.name, pa.list_(pa.string())))
+            elif pa.types.is_null(campo.type):
+                schema = schema.set(i, pa.field(campo.name, pa.string()))
+        return schema
+
+    def _scrivi(self, risultati, primo):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if self.scrittore is None:
+            schema = self._schema(risultati)
+            self.scrittore = pq.ParquetWriter(self.path, schema)
+        self.scrittore.write_table(pa.Table.from_pandas(risultati, schema=self.scrittore.schema, preserve_index=False))
+
+    def _chiudi(self):
+        if self.scrittore is not None:
+            self.scrittore.close()
+        self.scrittore = None
+
+class DestinazioneSQLite(Destinazione):
+
+    def __init__(self, path, dimensione_flush=100_000, tabella="risultati"):
+        import sqlite3
+        super().__init__(dimensione_flush)
+        self.tabella = tabella
+        self.connessione = sqlite3.connect(path)
+
+    def _scrivi(self, risultati, primo):
+        with self.connessione: #una transazione per flush
+            _unisci_liste(risultati).to_sql(self.tabella, self.connessione, if_exists="replace" if primo else "append",
+                                            index=False)
+
+    def _chiudi(self):
+        self.connessione.close()
+
+class StampaTerminale(Destinazione):
+    """Il resoconto colorato di ogni segmento, scritto sul flusso con una sola write per flush"""
+
+    def __init__(self, flusso=None, dimensione_flush=1_000):
+        super().__init__(dimensione_flush)
+        self.flusso = flusso or sys.stdout
+
+    def _scrivi(self, risultati, primo):
+        testo = []
+        for i, r in enumerate(risultati.itertuples(index=False), start=self.scritte):
+            testo.append(f"\nSegmento stradale {i}\n" + testo_conclusioni(
+                f"TrattoStradale_{r.id}", r.punteggio_pericolo, r.pericolo, r.stato_sicurezza, r.tipo_rischio,
+                r.raccomandazioni) + "\n")
+        self.flusso.write("".join(testo))
+        self.flusso.flush()
+
+class Destinazioni(Destinazione):
+    """Inoltra gli stessi risultati a più destinazioni, ognuna con il proprio flush"""
+
+    def __init__(self, destinazioni):
+        super().__init__(0)
+        self.destinazioni = list(destinazioni)
+
+    def _scrivi(self, risultati, primo):
+        for destinazione in self.destinazioni:
+            destinazione.scrivi(risultati)
+
+    def _chiudi(self):
+        for destinazione in self.destinazioni:
+            destinazione.chiudi()
+
+FORMATI = {".csv": DestinazioneCSV, ".jsonl": DestinazioneJSONL, ".parquet": DestinazioneParquet,
+           ".sqlite": DestinazioneSQLite, ".db": DestinazioneSQLite}
+
+def apri_destinazione(path, dimensione_flush=100_000):
+    """Destinazione scelta dall'estensione del file"""
+    estensione = os.path.splitext(path)[1].lower()
+    if estensione not in FORMATI:
+        raise ValueError(f"Formato di output non supportato: '{estensione}' (supportati: {', '.join(FORMATI)})")
+    return FORMATI[estensione](path, dimensione_flush)
+
+if __name__ == "__main__":
+    import time
+    import tempfile
+    import numpy as np
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    rischi = [[], ["RischioCurvatura"], ["RischioCurvatura", "RischioVisibilità"]]
+    raccomandazioni = [["Normale"], ["PrestareAttenzione", "Rallentare"], []]
+    scelte = rng.integers(0, 3, n)
+    risultati = pd.DataFrame({
+        "id": np.arange(n),
+        "pericolo": rng.integers(0, 2, n),
+        "probabilità_pericolo": rng.random(n),
+        "punteggio_pericolo": rng.random(n),
+        "stato_sicurezza": np.array(["Sicuro", "Pericolo", None], dtype=object)[scelte],
+        "tipo_rischio": [rischi[s] for s in scelte],
+        "raccomandazioni": [raccomandazioni[s] for s in scelte],
+    })
+    blocchi = np.array_split(np.arange(n), max(1, n // 50_000)) #come elabora_a_blocchi
+
+    with tempfile.TemporaryDirectory() as cartella:
+        for estensione in FORMATI:
+            if estensione == ".db":
+                continue
+            path = os.path.join(cartella, f"risultati{estensione}")
+            inizio = time.perf_counter()
+            try:
+                with apri_destinazione(path) as destinazione:
+                    for blocco in blocchi:
+                        destinazione(risultati.iloc[blocco])
+            except ImportError as e:
+                print(f"⚠️  {estensione}: {e}")
+                continue
+            print(f"⏱️  {estensione:<8} {n} segmenti in {time.perf_counter() - inizio:.2f}s "
+                  f"({os.path.getsize(path) / 1e6:.1f} MB)")
+
+        inizio = time.perf_counter()
+        with open(os.devnull, "w", encoding="utf-8") as nulla, StampaTerminale(nulla) as stampa:
+            for blocco in blocchi:
+                stampa(risultati.iloc[blocco])
+        print(f"⏱️  stampa    {n} segmenti in {time.perf_counter() - inizio:.2f}s (su {os.devnull})")
@@ -1,46 +1,103 @@
+import sys
+import argparse
+import pandas as pd
 import data_model_onto_csp_integration as sd #safe drive
+from destinazioni import StampaTerminale
 
 if __name__ == "__main__":
 
+    parser = argparse.ArgumentParser(description="SafeDrive: Classificatore -> Regressore -> Ontologia -> CSP")
+    parser.add_argument("--input", default="data/road_system.csv", help="csv dei segmenti stradali")
+    parser.add_argument("--blocco", type=int, default=None,
+                        help="elabora l'input in streaming a blocchi di N segmenti (senza CSP)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="elabora i corridoi stradali in parallelo su N processi")
+    parser.add_argument("--mmap", action="store_true",
+                        help="i worker condividono i modelli memory-mapped (python -m models.foresta_piatta)")
+    parser.add_argument("--tabella", default=None,
+                        help="tabella del rischio precalcolata al posto dei modelli (python -m models.tabella_rischio)")
+    parser.add_argument("--cache", type=int, default=0,
+                        help="cache LRU di N righe davanti a ogni modello, per segmenti ripetuti (0 = disattivata)")
+    parser.add_argument("--ragionatore", choices=["pellet", "nativo", "firme", "compilato", "persistente", "mondi"],
+                        default="pellet", help="ragionatore delle regole dell'ontologia (modalità streaming e parallela)")
+    parser.add_argument("--output", default="Results/segmenti_valutati.csv",
+                        help="risultati delle modalità streaming e parallela: .csv, .jsonl, .parquet, .sqlite o .db")
+    parser.add_argument("--flush", type=int, default=100_000,
+                        help="righe accumulate prima di ogni scrittura dell'output (0 = a ogni blocco)")
+    parser.add_argument("--stampa", action="store_true",
+                        help="nelle modalità streaming e parallela stampa anche il resoconto di ogni segmento")
+    args = parser.parse_args()
+
+    MODELLO_CLASSIFICAZIONE = "models/logistic_regression_model_negloglossTarget.pkl"
+    MODELLO_REGRESSIONE = "models/random_forest_model.pkl"
+
     ROSSO = "\033[31m"
     VERDE = "\033[32m"
     RESET = "\033[0m"
 
+    #=========Più corridoi stradali: ogni worker carica i modelli una sola volta=========#
+
+    if args.workers is not None:
+        risultati = sd.elabora_in_parallelo(sd.carica_dataset(args.input), MODELLO_CLASSIFICAZIONE,
+                                            MODELLO_REGRESSIONE, args.workers, mmap=args.mmap,
+                                            path_tabella=args.tabella, dimensione_cache=args.cache,
+                                            ragionatore=args.ragionatore)
+        with sd.apri_destinazioni(args.output, args.flush, args.stampa) as destinazione:
+            destinazione(risultati)
+        print(f"\nSegmenti messi in {VERDE}SICUREZZA{RESET}, risultati salvati in {args.output}")
+        sys.exit(0)
+
     #===============Carichiamo i modelli che abbiamo allenato in precedenza==============#
 
-    classificatore=sd.carica_modello("models/logistic_regression_model_negloglossTarget.pkl")
-    regressore=sd.carica_modello("models/random_forest_model.pkl")
+    classificatore=sd.con_cache(sd.carica_modello(MODELLO_CLASSIFICAZIONE), args.cache)
+    regressore=sd.con_cache(sd.carica_modello(MODELLO_REGRESSIONE), args.cache)
 
-    #===========Carichiamo il dataset: un esempio di strada divisa in segmenti===========#
+    #encoder delle feature salvati accanto ai modelli (None se non ancora costruiti)
+    encoder_classificatore=sd.carica_encoder(MODELLO_CLASSIFICAZIONE)
+    encoder_regressore=sd.carica_encoder(MODELLO_REGRESSIONE)
 
-    data=sd.carica_dataset('data/road_system.csv')
+    tabella=None
+    if args.tabella is not None:
+        from models.tabella_rischio import TabellaRischio
+        tabella=TabellaRischio.carica(args.tabella)
 
-    X_class=sd.preprocessa_dataset(data, add_scaler=True) 
-    #processiamo i dati con lo scaler perchè il modello di regressione logistica ottiene una performance migliore
+    #=====Inventari stradali molto grandi: elaborazione a blocchi con memoria limitata=====#
 
-    X_reg=sd.preprocessa_dataset(data, 'data/road_system.csv')
+    if args.blocco is not None:
+        with sd.apri_destinazioni(args.output, args.flush, args.stampa) as destinazione:
+            sd.elabora_a_blocchi(args.input, classificatore, regressore, destinazione,
+                                 args.blocco, encoder_classificatore, encoder_regressore, tabella, args.ragionatore)
+        print(f"\nRisultati salvati in {args.output}")
+        sys.exit(0)
+
+    #===========Carichiamo il dataset: un esempio di strada divisa in segmenti===========#
+
+    data=sd.carica_dataset(args.input)
 
     #========================Effetuiamo le predizioni sul dataset========================#
 
-    predizione_classificazione = sd.predizione(classificatore, X_class)
-    predizione_regressione = sd.predizione(regressore, X_reg)
+    if tabella is not None:
+        valutazioni = sd.valuta_segmenti_con_tabella(data, tabella, classificatore, regressore,
+                                                     encoder_classificatore, encoder_regressore)
+    else:
+        valutazioni = sd.valuta_segmenti(data, classificatore, regressore, encoder_classificatore, encoder_regressore)
+    #una sola chiamata per modello su tutto il dataset, il classificatore riceve i dati scalati
+    #perchè il modello di regressione logistica ottiene una performance migliore
 
     #==================Popoliamo l'ontologia e avviamo il ragionamento===================#
 
-    for i in range(len(data)):
+    individui = sd.ragiona_segmenti_SafeDrive(data, valutazioni) #un solo passaggio del ragionatore per tutti i segmenti
+
+    conclusioni = sd.estrai_conclusioni(individui).set_index(data.index) #una sola query per tutti i segmenti
 
-        #print(f"\nPredizione Classificatore = {predizione_classificazione[i]}, Predizione Regressore = {predizione_regressione[i]:.2f}")
-        #print(f"Record Analizato: \n{data.iloc[[i]]}")
-        x = sd.popola_ontologia_SafeDrive(data.iloc[i], predizione_classificazione[i], predizione_regressione[i])
-        sd.ragiona_ontologia_SafeDrive(x)
-        print(f"\nSegmento stradale {i}")
-        sd.stampa_conclusioni_ontologia_SafeDrive(x)
+    with StampaTerminale() as stampa: #resoconto di ogni segmento, scritto in una volta sola
+        stampa(pd.concat([valutazioni, conclusioni], axis=1))
 
     #=====Creiamo e risolviamo il CSP road_planner per ridurre il pericolo in strada=====#
 
     print(f"\nL'elaborazione potrebbe richiedere qualche secondo, {ROSSO}attendere...{RESET}\n")
     
-    lista_limiti = sd.messa_in_sicurezza(data, classificatore) #cspSoft.py riga 81 per ritornare alla verbosità originaria
+    lista_limiti = sd.messa_in_sicurezza(data, classificatore, encoder=encoder_classificatore) #cspSoft.py riga 81 per ritornare alla verbosità originaria
 
     print(f"\nSegmenti messi in {VERDE}SICUREZZA{RESET}")
     for i in range(len(data)):
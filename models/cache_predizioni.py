@@ -0,0 +1,89 @@
+"""Cache LRU delle predizioni davanti al classificatore e al regressore.
+
+Gli inventari stradali contengono molti segmenti con attributi identici e messa_in_sicurezza
+rivaluta le stesse righe ad ogni riduzione del limite: la cache memorizza l'uscita del modello
+per ogni riga codificata (chiave: i byte della riga) e lo invoca solo sulle righe mai viste,
+una volta sola per batch. predict e predict_proba hanno voci separate.
+"""
+
+from collections import OrderedDict
+import numpy as np
+
+class CachePredizioni(object):
+    """Avvolge un modello sklearn (o ForestaPiatta) esponendo le stesse predict e predict_proba"""
+
+    def __init__(self, modello, dimensione_massima=100_000):
+        self.dimensione_massima = dimensione_massima
+        self.modello = modello
+
+    @property
+    def modello(self):
+        return self._modello
+
+    @modello.setter
+    def modello(self, modello):
+        """Un nuovo modello invalida tutte le predizioni memorizzate"""
+        self._modello = modello
+        self.invalida()
+
+    def invalida(self):
+        self.voci = OrderedDict()
+        self.successi = 0
+        self.mancati = 0
+
+    def statistiche(self):
+        richieste = self.successi + self.mancati
+        return {
+            "successi": self.successi,
+            "mancati": self.mancati,
+            "voci": len(self.voci),
+            "tasso_successo": self.successi / richieste if richieste else 0.0,
+        }
+
+    def predict(self, X):
+        return self._predici("predict", X)
+
+    def predict_proba(self, X):
+        return self._predici("predict_proba", X)
+
+    def __getattr__(self, nome):
+        # classes_, feature_names_in_, ... del modello avvolto
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        return getattr(self._modello, nome)
+
+    def _predici(self, metodo, X):
+        righe = np.ascontiguousarray(X, dtype=np.float64)
+        if len(righe) == 0:
+            return getattr(self._modello, metodo)(X) # forma dell'uscita vuota decisa dal modello, es. (0, classi)
+        intestazione = (metodo, tuple(X.columns) if hasattr(X, "columns") else None)
+
+        # le righe ripetute nel batch vengono cercate (e calcolate) una volta sola
+        uniche, inverso = np.unique(righe, axis=0, return_inverse=True)
+        rappresentanti = np.empty(len(uniche), dtype=np.intp)
+        rappresentanti[inverso.ravel()] = np.arange(len(righe))
+
+        uscite = [None] * len(uniche)
+        da_calcolare = []
+        for k, riga in enumerate(uniche):
+            chiave = (intestazione, riga.tobytes())
+            if chiave in self.voci:
+                self.voci.move_to_end(chiave)
+                uscite[k] = self.voci[chiave]
+            else:
+                da_calcolare.append(k)
+        # successi: righe servite senza invocare il modello, ripetizioni nel batch comprese
+        self.successi += len(righe) - len(da_calcolare)
+        self.mancati += len(da_calcolare)
+
+        if da_calcolare:
+            # il modello riceve le righe originali (con i nomi di colonna, se presenti)
+            indici = rappresentanti[da_calcolare]
+            originali = X.iloc[indici] if hasattr(X, "iloc") else np.asarray(X)[indici]
+            for k, uscita in zip(da_calcolare, getattr(self._modello, metodo)(originali)):
+                uscite[k] = uscita
+                self.voci[(intestazione, uniche[k].tobytes())] = uscita
+            while len(self.voci) > self.dimensione_massima:
+                self.voci.popitem(last=False)
+
+        return np.asarray(uscite)[inverso.ravel()]
@@ -0,0 +1,138 @@
+"""Formato piatto e memory-mapped per il RandomForestRegressor di random_forest.py.
+
+sklearn ricopia i nodi di ogni albero quando il pickle viene caricato, quindi joblib con
+mmap_mode non basta a condividere la foresta tra processi. Qui tutti gli alberi vengono
+salvati come array contigui non compressi (.npy), aperti con np.load(mmap_mode='r'):
+N worker condividono una sola copia fisica tramite la page cache e il caricamento è immediato.
+
+I nodi di ogni albero sono numerati in ampiezza, così i due figli sono sempre adiacenti
+(il destro è sinistro + 1 e non serve salvarlo) e un passo di discesa è figlio = sinistro + (x > soglia).
+Le foglie puntano a se stesse con soglia +inf: scendere di un livello in più non cambia
+il nodo raggiunto, quindi tutte le righe possono fare lo stesso numero di passi.
+
+Uso (dalla radice del repository):
+    python -m models.foresta_piatta models/random_forest_model.pkl
+"""
+
+import os
+import sys
+import json
+import numpy as np
+
+ARRAY = ("feature", "soglia", "sinistro", "valore", "radici")
+
+def percorso_foresta_piatta(path_modello):
+    """La foresta piatta vive accanto al pickle: models/x.pkl -> models/x_mmap/"""
+    return f"{os.path.splitext(path_modello)[0]}_mmap"
+
+def _nodi_in_ampiezza(albero):
+    """Ordine in ampiezza dei nodi di un albero sklearn: i figli di ogni nodo risultano adiacenti"""
+    ordine = [0]
+    for nodo in ordine:
+        if albero.children_left[nodo] != -1:
+            ordine += [albero.children_left[nodo], albero.children_right[nodo]]
+    return np.array(ordine)
+
+def esporta_foresta(modello, cartella):
+    """Salva tutti gli alberi di un RandomForestRegressor in array contigui (un .npy per array)"""
+    alberi = [stimatore.tree_ for stimatore in modello.estimators_]
+    inizio = np.cumsum([0] + [albero.node_count for albero in alberi])
+
+    feature, soglia, sinistro, valore = [], [], [], []
+    for albero, offset in zip(alberi, inizio):
+        ordine = _nodi_in_ampiezza(albero)
+        nuovo_indice = np.empty(albero.node_count, dtype=np.intp)
+        nuovo_indice[ordine] = np.arange(albero.node_count) + offset
+
+        foglia = albero.children_left[ordine] == -1
+        feature.append(np.where(foglia, 0, albero.feature[ordine]))
+        soglia.append(np.where(foglia, np.inf, albero.threshold[ordine]))
+        sinistro.append(np.where(foglia, nuovo_indice[ordine], nuovo_indice[albero.children_left[ordine]]))
+        valore.append(albero.value[ordine, 0, 0])
+
+    soglia = np.concatenate(soglia)
+
+    # sklearn confronta x float32 con soglie float64. Arrotondando ogni soglia al float32
+    # immediatamente inferiore il confronto resta identico (x <= s  <=>  x <= s32) e si dimezza la memoria
+    soglia32 = soglia.astype(np.float32)
+    soglia32 = np.where(soglia32.astype(np.float64) > soglia, np.nextafter(soglia32, np.float32(-np.inf)), soglia32)
+
+    # indici intp: np.take non deve convertirli ad ogni passo
+    array = {
+        "feature": np.concatenate(feature).astype(np.intp),
+        "soglia": soglia32,
+        "sinistro": np.concatenate(sinistro).astype(np.intp),
+        "valore": np.concatenate(valore).astype(np.float64),
+        "radici": inizio[:-1].astype(np.intp),
+    }
+
+    os.makedirs(cartella, exist_ok=True)
+    for nome in ARRAY:
+        np.save(os.path.join(cartella, f"{nome}.npy"), np.ascontiguousarray(array[nome]))
+    metadati = {
+        "n_alberi": len(alberi),
+        "profondità": int(max(albero.max_depth for albero in alberi)),
+        "feature_names": [str(f) for f in getattr(modello, "feature_names_in_", [])],
+    }
+    with open(os.path.join(cartella, "metadati.json"), "w") as f:
+        json.dump(metadati, f, ensure_ascii=False)
+    print(f"💾 Foresta piatta salvata in {cartella}: {metadati['n_alberi']} alberi, {len(array['feature'])} nodi")
+    return cartella
+
+class ForestaPiatta(object):
+    """Random Forest di regressione sopra gli array di esporta_foresta, con la stessa predict di sklearn"""
+
+    def __init__(self, array, metadati):
+        for nome in ARRAY:
+            setattr(self, nome, array[nome])
+        self.n_alberi = metadati["n_alberi"]
+        self.profondità = metadati["profondità"]
+        self.feature_names_in_ = np.array(metadati["feature_names"], dtype=object)
+
+    @classmethod
+    def carica(cls, cartella, mmap=True):
+        """mmap : se True gli array restano sul disco e vengono condivisi tramite la page cache"""
+        # np.asarray toglie la sottoclasse memmap (che rallenta ogni take) ma resta una vista sul file
+        array = {nome: np.asarray(np.load(os.path.join(cartella, f"{nome}.npy"), mmap_mode="r" if mmap else None))
+                 for nome in ARRAY}
+        with open(os.path.join(cartella, "metadati.json")) as f:
+            metadati = json.load(f)
+        return cls(array, metadati)
+
+    def predict(self, X, dimensione_blocco=1024):
+        """
+        Stesso risultato, bit per bit, di RandomForestRegressor.predict: le feature vengono
+        confrontate in float32 (con le soglie arrotondate di esporta_foresta) e le predizioni
+        degli alberi sommate in float64 nell'ordine degli alberi, poi divise per il loro numero.
+        dimensione_blocco : righe elaborate insieme, limita la matrice alberi x righe in memoria
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        predizioni = np.empty(len(X), dtype=np.float64)
+        for inizio in range(0, len(X), dimensione_blocco):
+            predizioni[inizio:inizio + dimensione_blocco] = self._predici_blocco(X[inizio:inizio + dimensione_blocco])
+        return predizioni
+
+    def _predici_blocco(self, X):
+        # Tutte le righe scendono in tutti gli alberi un livello alla volta. nodi è (alberi x righe):
+        # righe vicine visitano lo stesso albero, che resta in cache
+        base = np.arange(len(X)) * X.shape[1]
+        X_piatta = X.ravel()
+        nodi = np.repeat(self.radici[:, None], len(X), axis=1)
+        for _ in range(self.profondità):
+            a_destra = X_piatta.take(base + self.feature.take(nodi)) > self.soglia.take(nodi)
+            nodi = self.sinistro.take(nodi) + a_destra
+
+        # La somma segue l'ordine degli alberi come sklearn (np.sum userebbe la somma a coppie)
+        somma = np.zeros(len(X), dtype=np.float64)
+        for valori_albero in self.valore.take(nodi):
+            somma += valori_albero
+        return somma / self.n_alberi
+
+def verifica_compatibilità(modello, foresta, X):
+    """True se la foresta piatta restituisce esattamente le predizioni del modello sklearn"""
+    return np.array_equal(modello.predict(X), foresta.predict(X))
+
+if __name__ == "__main__":
+    import joblib
+    path_modello = sys.argv[1] if len(sys.argv) > 1 else "models/random_forest_model.pkl"
+    esporta_foresta(joblib.load(path_modello), percorso_foresta_piatta(path_modello))
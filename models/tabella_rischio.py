@@ -0,0 +1,170 @@
+"""Tabella precalcolata del rischio sullo spazio (piccolo) delle feature.
+
+Tutte le feature di EXPECTED_FEATURES tranne curvature sono categoriche, booleane o assumono
+pochi valori: la tabella valuta una volta sola classificatore e regressore su tutta la griglia
+discreta x una griglia fine di curvature. In inferenza ogni segmento costa un indice e
+un'interpolazione lineare sulla curvatura, senza chiamare i modelli.
+
+L'errore di interpolazione viene stimato sui punti medi della griglia di curvatura e salvato
+con la tabella (errore_probabilità, errore_punteggio): è il massimo scarto osservato sui punti
+campionati, una stima e non un limite garantito. I segmenti fuori dalla griglia
+(valori mai visti, curvatura fuori intervallo) vengono passati alla funzione di ripiego.
+
+Uso (dalla radice del repository):
+    python -m models.tabella_rischio
+"""
+
+import sys
+import numpy as np
+
+PATH_TABELLA = "models/tabella_rischio.npz"
+
+# Valori ammessi per ogni colonna discreta di road_system.csv (speed_limit in mph)
+GRIGLIA = {
+    "road_type": ["highway", "rural", "urban"],
+    "weather": ["clear", "foggy", "rainy"],
+    "time_of_day": ["afternoon", "evening", "morning"],
+    "lighting": ["daylight", "dim", "night"],
+    "holiday": [False, True],
+    "school_season": [False, True],
+    "road_signs_present": [False, True],
+    "public_road": [False, True],
+    "num_lanes": [1, 2, 3, 4],
+    "speed_limit": [25, 35, 45, 60, 70],
+}
+
+def segmenti_della_griglia(griglia, curvature):
+    """Tutte le combinazioni della griglia discreta (prima dimensione) x curvature (ultima)"""
+    assi = np.meshgrid(*[np.arange(len(v)) for v in griglia.values()], np.arange(len(curvature)), indexing="ij")
+    segmenti = {col: np.asarray(valori, dtype=object)[asse.ravel()]
+                for (col, valori), asse in zip(griglia.items(), assi)}
+    segmenti["curvature"] = curvature[assi[-1].ravel()]
+    return segmenti
+
+class TabellaRischio(object):
+
+    def __init__(self, griglia, curvature, probabilità, punteggio, errore_probabilità, errore_punteggio):
+        self.griglia = griglia
+        self.curvature = curvature
+        self.probabilità = probabilità  # (celle discrete x curvature), probabilità della classe 1
+        self.punteggio = punteggio      # (celle discrete x curvature), predizione del regressore
+        self.errore_probabilità = errore_probabilità  # stime dell'errore di interpolazione (costruisci)
+        self.errore_punteggio = errore_punteggio
+
+    @classmethod
+    def costruisci(cls, modello_classificazione, encoder_classificazione, modello_regressione,
+                   encoder_regressione, passo_curvatura=0.01, griglia=GRIGLIA, campioni_errore=200_000):
+        """
+        Valuta i due modelli su griglia discreta x curvature in [0, 1] a passo passo_curvatura.
+        L'errore di interpolazione viene stimato come massimo scarto tra modelli e interpolazione
+        su campioni_errore punti medi scelti a caso (tutti se None): la stima non copre i punti
+        non campionati né quelli tra un punto medio e i nodi della griglia.
+        """
+        curvature = np.round(np.arange(0, 1 + passo_curvatura / 2, passo_curvatura), 6)
+        forma = [len(v) for v in griglia.values()]
+        celle = int(np.prod(forma))
+
+        segmenti = segmenti_della_griglia(griglia, curvature)
+        probabilità = modello_classificazione.predict_proba(encoder_classificazione.trasforma(segmenti))[:, 1]
+        punteggio = modello_regressione.predict(encoder_regressione.trasforma(segmenti))
+        tabella = cls(griglia, curvature,
+                      probabilità.reshape(celle, len(curvature)).astype(np.float32),
+                      punteggio.reshape(celle, len(curvature)).astype(np.float32), 0.0, 0.0)
+
+        # Stima dell'errore: confronto tra modelli e interpolazione sui punti medi della griglia
+        medi = segmenti_della_griglia(griglia, (curvature[:-1] + curvature[1:]) / 2)
+        if campioni_errore is not None and campioni_errore < len(medi["curvature"]):
+            scelti = np.random.default_rng(0).choice(len(medi["curvature"]), campioni_errore, replace=False)
+            medi = {col: valori[scelti] for col, valori in medi.items()}
+        indici, validi = tabella.indici(medi)
+        prob_tab, punt_tab = tabella.interpola(indici, medi["curvature"])
+        prob_mod = modello_classificazione.predict_proba(encoder_classificazione.trasforma(medi))[:, 1]
+        punt_mod = modello_regressione.predict(encoder_regressione.trasforma(medi))
+        tabella.errore_probabilità = float(np.abs(prob_tab - prob_mod).max())
+        tabella.errore_punteggio = float(np.abs(punt_tab - punt_mod).max())
+        return tabella
+
+    def indici(self, segmenti):
+        """Indice della cella discreta di ogni segmento e maschera dei segmenti coperti dalla tabella"""
+        n = len(segmenti["curvature"])
+        indice = np.zeros(n, dtype=np.intp)
+        validi = np.ones(n, dtype=bool)
+        for col, valori in self.griglia.items():
+            colonna = np.asarray(segmenti[col])
+            codice = np.zeros(n, dtype=np.intp)
+            trovato = np.zeros(n, dtype=bool)
+            for k, valore in enumerate(valori):
+                uguale = colonna == valore
+                codice[uguale] = k
+                trovato |= uguale
+            indice = indice * len(valori) + codice
+            validi &= trovato
+
+        curvatura = np.asarray(segmenti["curvature"], dtype=np.float64)
+        validi &= (curvatura >= self.curvature[0]) & (curvatura <= self.curvature[-1])
+        return indice, validi
+
+    def interpola(self, indice, curvatura):
+        """Interpolazione lineare sulla curvatura dentro la cella discreta"""
+        curvatura = np.clip(np.asarray(curvatura, dtype=np.float64), self.curvature[0], self.curvature[-1])
+        passo = self.curvature[1] - self.curvature[0]
+        posizione = (curvatura - self.curvature[0]) / passo
+        sotto = np.clip(np.floor(posizione).astype(np.intp), 0, len(self.curvature) - 2)
+        peso = np.clip(posizione - sotto, 0.0, 1.0)
+        risultati = []
+        for valori in (self.probabilità, self.punteggio):
+            risultati.append((1 - peso) * valori[indice, sotto] + peso * valori[indice, sotto + 1])
+        return risultati
+
+    def valuta(self, segmenti_stradali, ripiego=None):
+        """
+        segmenti_stradali : dataframe di road_system.csv non processato
+        Restituisce lo stesso dataframe di valuta_segmenti, più la colonna in_tabella.
+        ripiego : funzione (dataframe -> valutazioni) per i segmenti fuori tabella, es. valuta_segmenti;
+        senza ripiego le loro predizioni restano mancanti (pericolo è un intero nullable)
+        """
+        import pandas as pd
+        indice, validi = self.indici(segmenti_stradali)
+        probabilità, punteggio = self.interpola(indice, segmenti_stradali["curvature"])
+
+        valutazioni = pd.DataFrame({"id": segmenti_stradali["id"].to_numpy()}, index=segmenti_stradali.index)
+        valutazioni["pericolo"] = pd.array(np.where(validi, probabilità > 0.5, pd.NA), dtype="Int64")
+        valutazioni["probabilità_pericolo"] = np.where(validi, probabilità, np.nan)
+        valutazioni["punteggio_pericolo"] = np.where(validi, punteggio, np.nan)
+        valutazioni["in_tabella"] = validi
+
+        if ripiego is not None and not validi.all():
+            fuori = ripiego(segmenti_stradali[~validi])
+            valutazioni.loc[~validi, fuori.columns] = fuori
+        return valutazioni
+
+    def salva(self, path=PATH_TABELLA):
+        np.savez(path, curvature=self.curvature, probabilità=self.probabilità, punteggio=self.punteggio,
+                 errore_probabilità=self.errore_probabilità, errore_punteggio=self.errore_punteggio,
+                 **{f"griglia_{col}": np.asarray(valori) for col, valori in self.griglia.items()})
+        print(f"💾 Tabella del rischio salvata in {path}: {self.probabilità.size} valori, "
+              f"errore massimo stimato {self.errore_probabilità:.4f} (probabilità), "
+              f"{self.errore_punteggio:.4f} (punteggio)")
+        return path
+
+    @classmethod
+    def carica(cls, path=PATH_TABELLA):
+        dati = np.load(path)
+        griglia = {nome[len("griglia_"):]: dati[nome].tolist() for nome in dati.files if nome.startswith("griglia_")}
+        return cls(griglia, dati["curvature"], dati["probabilità"], dati["punteggio"],
+                   float(dati["errore_probabilità"]), float(dati["errore_punteggio"]))
+
+if __name__ == "__main__":
+    import data_model_onto_csp_integration as sd
+    from data.feature_encoder import FeatureEncoder
+
+    path_classificazione = sys.argv[1] if len(sys.argv) > 1 else "models/logistic_regression_model_negloglossTarget.pkl"
+    path_regressione = sys.argv[2] if len(sys.argv) > 2 else "models/random_forest_model.pkl"
+
+    encoder_classificazione = sd.carica_encoder(path_classificazione)
+    if encoder_classificazione is None:
+        print("❌ Errore: serve l'encoder del classificatore (data/preprocessing.py, cella [3b]).")
+        sys.exit(1)
+    TabellaRischio.costruisci(sd.carica_modello(path_classificazione), encoder_classificazione,
+                              sd.carica_modello(path_regressione, mmap=True),
+                              sd.carica_encoder(path_regressione) or FeatureEncoder()).salva()
@@ -0,0 +1,89 @@
+"""Punto di accesso all'ontologia SafeDrive: snapshot precompilato oppure definizioni Python.
+
+onto/ontology.py dichiara a ogni import classi, proprietà e individui e riesegue il parsing di
+ogni regola SWRL. La fase di build serializza l'ontologia finita (regole comprese) in
+onto/ontology_snapshot.nt, insieme all'impronta SHA-256 di ontology.py: a runtime lo snapshot
+viene caricato direttamente e le definizioni Python vengono eseguite solo se l'impronta
+non corrisponde più (snapshot vecchio o assente).
+
+Espone gli stessi nomi di onto/ontology.py (onto, TrattoStradale, Autostrada, haPericolo, ...).
+
+Build dello snapshot (dalla radice del repository):
+    python -m onto.carica_ontologia
+"""
+
+import os
+import sys
+import hashlib
+from itertools import chain
+from owlready2 import default_world, get_ontology
+
+CARTELLA = os.path.dirname(os.path.abspath(__file__))
+DEFINIZIONE = os.path.join(CARTELLA, "ontology.py")
+SNAPSHOT = os.path.join(CARTELLA, "ontology_snapshot.nt")
+IMPRONTA = SNAPSHOT + ".sha256"
+IRI = "http://safedrive.it/ontology.owl"
+
+#Per reti molto grandi il quadstore può stare su disco (SQLite) invece che in memoria:
+#SAFEDRIVE_QUADSTORE=percorso/quadstore.sqlite3, da impostare prima di caricare l'ontologia
+if os.environ.get("SAFEDRIVE_QUADSTORE") and default_world.filename == ":memory:":
+    default_world.set_backend(filename=os.environ["SAFEDRIVE_QUADSTORE"], exclusive=False)
+
+def impronta_definizione():
+    with open(DEFINIZIONE, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def snapshot_aggiornato():
+    """True se lo snapshot esiste ed è stato costruito dall'attuale onto/ontology.py"""
+    if not (os.path.exists(SNAPSHOT) and os.path.exists(IMPRONTA)):
+        return False
+    with open(IMPRONTA) as f:
+        return f.read().strip() == impronta_definizione()
+
+def costruisci_snapshot():
+    """Esegue le definizioni Python e salva l'ontologia risultante con la sua impronta"""
+    from onto.ontology import onto
+    onto.save(SNAPSHOT, format="ntriples")
+    with open(IMPRONTA, "w") as f:
+        f.write(impronta_definizione() + "\n")
+    print(f"💾 Snapshot dell'ontologia salvato in {SNAPSHOT}")
+    return onto
+
+def carica():
+    if snapshot_aggiornato():
+        ontologia = get_ontology(IRI)
+        if not ontologia.loaded:
+            with open(SNAPSHOT, "rb") as f:
+                ontologia.load(fileobj=f, format="ntriples")
+        return ontologia
+    from onto.ontology import onto
+    return onto
+
+def parte_fissa(ontologia=None, classe="TrattoStradale"):
+    """
+    N-Triples dell'ontologia (classi, proprietà, regole, individui di riferimento) senza gli
+    individui della classe dei dati e senza i python_name di owlready2: lo schema da clonare
+    in un altro mondo o da passare a un ragionatore esterno
+    """
+    import io
+    from owlready2.base import rdf_type
+    ontologia = ontologia or onto
+    mondo = ontologia.world
+    python_name = mondo._abbreviate("http://www.lesfleursdunormal.fr/static/_downloads/owlready_ontology.owl#python_name")
+    individui = {s for s, in mondo.graph.execute("SELECT s FROM objs WHERE p=? AND o=?", (rdf_type, ontologia[classe].storid))}
+    individui.add(mondo._abbreviate("http://anonymous")) #ontologia di servizio di owlready2, altrimenti il clone la prenderebbe come sua
+    schema = io.BytesIO()
+    mondo.save(schema, format="ntriples", filter=lambda grafo, s, p, o, d: p != python_name and s not in individui)
+    return schema.getvalue()
+
+onto = carica()
+
+# gli stessi nomi che onto/ontology.py definisce a livello di modulo
+globals().update({entità.name: entità for entità in chain(onto.classes(), onto.properties(), onto.individuals())})
+
+if __name__ == "__main__":
+    # se lo snapshot era vecchio, carica() ha già eseguito le definizioni Python
+    if "onto.ontology" in sys.modules:
+        costruisci_snapshot()
+    else:
+        print("✅ Snapshot dell'ontologia già aggiornato")
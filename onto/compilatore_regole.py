@@ -0,0 +1,287 @@
+"""Compilatore delle regole SWRL di onto/ontology.py in un modulo Python generato.
+
+Legge gli Imp dell'ontologia (tramite onto/motore_regole.py) e scrive onto/regole_compilate.py:
+- ragiona(colonne): predicati NumPy in linea retta, una istruzione per regola in ordine
+  topologico (le regole che producono una proprietà vengono prima di quelle che la leggono),
+  senza interprete e senza punto fisso;
+- conclusioni_da_tabella, che legge la tabella di decisione firma -> (StatoSicurezza, insieme
+  di TipoRischio, insieme di Raccomandazione) su tutte le firme possibili (onto/firme_regole.py).
+  La tabella è un dato, non codice: sta in onto/regole_compilate.json, accanto al modulo.
+
+Il modulo generato dipende solo da NumPy (pandas per restituire il dataframe delle conclusioni)
+e contiene l'impronta di onto/ontology.py. Non viene mai rigenerato a runtime (installazioni
+in sola lettura, worker in parallelo): se l'ontologia è cambiata carica_regole_compilate()
+solleva un errore e lo si rigenera a mano con il comando qui sotto.
+
+Uso (dalla radice del repository):
+    python -m onto.compilatore_regole            # rigenera onto/regole_compilate.py
+    python -m onto.compilatore_regole 500        # ... e lo confronta con Pellet su 500 tratti
+"""
+
+import os
+import sys
+import json
+import importlib
+import numpy as np
+from onto.motore_regole import MotoreRegole, CONCLUSIONI, FunctionalProperty
+
+MODULO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regole_compilate.py")
+TABELLA = os.path.splitext(MODULO)[0] + ".json"
+
+OPERATORI = {
+    "greaterThan": ">",
+    "greaterThanOrEqual": ">=",
+    "lessThan": "<",
+    "lessThanOrEqual": "<=",
+    "equal": "==",
+    "notEqual": "!=",
+}
+
+# Parte fissa del modulo generato
+SUPPORTO = '''
+def _righe(colonne):
+    return len(colonne.index) if hasattr(colonne, "index") else len(next(iter(colonne.values())))
+
+def _maschera(colonne, proprietà, individuo, n):
+    if proprietà not in colonne:
+        return np.zeros(n, dtype=bool)
+    return np.asarray(colonne[proprietà], dtype=object) == individuo
+
+def _dati(colonne, proprietà, n):
+    if proprietà not in colonne:
+        return np.full(n, np.nan)
+    return np.array(colonne[proprietà], dtype=np.float64)
+
+def firma(colonne):
+    """Firma intera di ogni riga, identica a MemoriaConclusioni.firme"""
+    n = _righe(colonne)
+    codice_firma = np.zeros(n, dtype=np.int64)
+    for proprietà, soglie in SOGLIE.items():
+        valori = _dati(colonne, proprietà, n)
+        codice = np.zeros(n, dtype=np.int64)
+        for soglia, lato in soglie:
+            codice += valori > soglia if lato == "sinistra" else valori >= soglia
+        codice[np.isnan(valori)] = len(soglie) + 1
+        codice_firma = codice_firma * (len(soglie) + 2) + codice
+    for proprietà, nomi in INDIVIDUI.items():
+        valori = np.asarray(colonne[proprietà], dtype=object) if proprietà in colonne else np.full(n, None)
+        codice = np.zeros(n, dtype=np.int64)
+        for k, nome in enumerate(nomi):
+            codice[valori == nome] = k + 1
+        codice_firma = codice_firma * (len(nomi) + 1) + codice
+    return codice_firma
+
+def _valori_oggetto(oggetti, proprietà, n):
+    nomi = sorted(nome for p, nome in oggetti if p == proprietà)
+    if proprietà in FUNZIONALI:
+        return np.select([oggetti[(proprietà, nome)] for nome in nomi], nomi, default=None).tolist() \\
+            if nomi else [None] * n
+    codice = np.zeros(n, dtype=np.int64)
+    for k, nome in enumerate(nomi):
+        codice |= oggetti[(proprietà, nome)].astype(np.int64) << k
+    combinazioni, inverso = np.unique(codice, return_inverse=True)
+    liste = np.empty(len(combinazioni), dtype=object)
+    for j, c in enumerate(combinazioni):
+        liste[j] = [nome for k, nome in enumerate(nomi) if c >> k & 1]
+    return liste[inverso.ravel()]
+
+def conclusioni(colonne):
+    """Dataframe stato_sicurezza / tipo_rischio / raccomandazioni, come MotoreRegole.conclusioni"""
+    import pandas as pd
+    oggetti, _ = ragiona(colonne)
+    n = _righe(colonne)
+    return pd.DataFrame({nome: _valori_oggetto(oggetti, proprietà, n) for nome, proprietà in CONCLUSIONI.items()},
+                        index=getattr(colonne, "index", None))
+
+def _carica_tabella(path=TABELLA):
+    """Tabella di decisione scritta da onto/compilatore_regole.py accanto a questo modulo"""
+    with open(path, encoding="utf-8") as f:
+        tabella = json.load(f)
+    if tabella["impronta"] != IMPRONTA:
+        raise RuntimeError(f"{path} non corrisponde a questo modulo: rigenera con python -m onto.compilatore_regole")
+    return (np.array(tabella["firme"], dtype=np.int64), np.array(tabella["indici"], dtype=np.intp),
+            tabella["conclusioni"])
+
+def conclusioni_da_tabella(colonne):
+    """Stesse conclusioni lette dalla tabella di decisione: una ricerca per riga"""
+    import pandas as pd
+    combinazione = TABELLA_INDICI[np.searchsorted(TABELLA_FIRME, firma(colonne))]
+    colonne_tabella = {}
+    for j, nome in enumerate(CONCLUSIONI):
+        tabella = np.empty(len(TABELLA_CONCLUSIONI), dtype=object)
+        for k, valori in enumerate(TABELLA_CONCLUSIONI):
+            tabella[k] = valori[j] if isinstance(valori[j], str) or valori[j] is None else list(valori[j])
+        colonne_tabella[nome] = tabella[combinazione]
+    return pd.DataFrame(colonne_tabella, index=getattr(colonne, "index", None))
+'''
+
+def impronta_ontologia():
+    from onto.carica_ontologia import impronta_definizione
+    return impronta_definizione()
+
+def ordine_topologico(regole):
+    """Le regole che producono una proprietà prima di quelle che la leggono (ordine originale a parità)"""
+    produce = [{p for _, p, _ in regola.testa} for regola in regole]
+    legge = [{p for tipo, p, _ in regola.corpo if tipo != "classe"} for regola in regole]
+    ordinate, restanti = [], list(range(len(regole)))
+    while restanti:
+        pronte = [i for i in restanti if not any(legge[i] & produce[j] for j in restanti if j != i)]
+        if not pronte:
+            raise ValueError("le regole sono cicliche: serve il punto fisso del motore nativo")
+        ordinate += pronte
+        restanti = [i for i in restanti if i not in pronte]
+    return [regole[i] for i in ordinate]
+
+def _identificatore(*parti):
+    nome = "__".join(str(p) for p in parti)
+    if not nome.isidentifier():
+        raise ValueError(f"nome non utilizzabile nel codice generato: {nome}")
+    return nome
+
+def _compila_regola(regola):
+    """Righe di codice di una regola: maschera del corpo e aggiornamento della testa"""
+    legate, condizioni = {}, []
+    for tipo, a, b in regola.corpo:
+        if tipo == "oggetto":
+            condizioni.append(_identificatore(a, b))
+        elif tipo == "dato":
+            condizioni.append(f"({_identificatore(a)} == {b!r})")
+        elif tipo == "lega":
+            legate[b] = _identificatore(a)
+            condizioni.append(f"~np.isnan({legate[b]})")
+        elif tipo == "confronto":
+            sinistra, destra = [legate[v] if k == "variabile" else repr(v) for k, v in b]
+            condizioni.append(f"({sinistra} {OPERATORI[a]} {destra})")
+    righe = [f"    # {regola.nome}",
+             f"    m = {' & '.join(condizioni) if condizioni else 'np.ones(n, dtype=bool)'}"]
+    for tipo, a, b in regola.testa:
+        if tipo == "oggetto":
+            righe.append(f"    {_identificatore(a, b)} = {_identificatore(a, b)} | m")
+        else:
+            valore = legate[b] if tipo == "copia" else repr(b)
+            righe.append(f"    {_identificatore(a)} = np.where(m & np.isnan({_identificatore(a)}), {valore}, {_identificatore(a)})")
+    return righe
+
+def _rappresentanti(soglie):
+    """Un valore per ogni fascia delle soglie (NaN compreso), calcolato come in firma()"""
+    candidati = [np.nan] + [v for s, _ in soglie for v in (s - 1e-6, s, s + 1e-6)]
+    fasce = {}
+    for v in candidati:
+        codice = len(soglie) + 1 if np.isnan(v) else sum(v > s if lato == "sinistra" else v >= s for s, lato in soglie)
+        fasce.setdefault(codice, v)
+    return [fasce[c] for c in sorted(fasce)]
+
+def tabella_decisione(memoria):
+    """Frame con un rappresentante per ogni firma possibile, nell'ordine delle firme"""
+    import pandas as pd
+    assi = [_rappresentanti(s) for s in memoria.soglie.values()] + \
+           [[None] + nomi for nomi in memoria.individui.values()]
+    griglia = np.meshgrid(*[np.arange(len(a)) for a in assi], indexing="ij")
+    return pd.DataFrame({col: np.asarray(asse, dtype=object)[g.ravel()]
+                         for col, asse, g in zip(memoria.colonne(), assi, griglia)}).infer_objects()
+
+def genera_modulo(motore=None, path=MODULO):
+    from onto.firme_regole import MemoriaConclusioni
+    motore = motore or MotoreRegole()
+    regole = ordine_topologico(motore.regole)
+    memoria = MemoriaConclusioni(motore, ragionatore="nativo")
+
+    menzionate = sorted({(a, b) for regola in regole for tipo, a, b in regola.corpo + regola.testa if tipo == "oggetto"})
+    dati = sorted({a for regola in regole for tipo, a, _ in regola.corpo + regola.testa
+                   if tipo in ("dato", "lega", "copia")})
+    funzionali = sorted(p for p in CONCLUSIONI.values() if FunctionalProperty in motore.ontologia[p].is_a)
+
+    corpo = ["def ragiona(colonne):",
+             '    """colonne : dataframe o dizionario proprietà -> valori (nomi degli individui per le proprietà oggetto)"""',
+             "    n = _righe(colonne)"]
+    corpo += [f"    {_identificatore(a, b)} = _maschera(colonne, {a!r}, {b!r}, n)" for a, b in menzionate]
+    corpo += [f"    {_identificatore(a)} = _dati(colonne, {a!r}, n)" for a in dati]
+    corpo.append("")
+    for regola in regole:
+        corpo += _compila_regola(regola)
+    corpo.append("")
+    corpo += ["    oggetti = {"] + [f"        ({a!r}, {b!r}): {_identificatore(a, b)}," for a, b in menzionate] + ["    }"]
+    corpo += ["    dati = {"] + [f"        {a!r}: {_identificatore(a)}," for a in dati] + ["    }"]
+    corpo.append("    return oggetti, dati")
+
+    # tabella di decisione: tutte le firme possibili, conclusioni calcolate con il motore nativo
+    rappresentanti = tabella_decisione(memoria)
+    firme = memoria.firme(rappresentanti)
+    conclusioni = motore.conclusioni(rappresentanti)
+    ordine = np.argsort(firme)
+    combinazioni, indici = {}, []
+    for stato, rischi, raccomandazioni in zip(*(conclusioni[c].iloc[ordine] for c in CONCLUSIONI)):
+        chiave = (None if stato != stato else stato, tuple(rischi), tuple(raccomandazioni))
+        indici.append(combinazioni.setdefault(chiave, len(combinazioni)))
+
+    testo = [
+        '"""Regole SWRL di onto/ontology.py compilate in predicati NumPy e in una tabella di decisione.',
+        "",
+        "Generato da onto/compilatore_regole.py: non modificare a mano.",
+        "La tabella di decisione è in regole_compilate.json, accanto a questo file.",
+        '"""',
+        "",
+        "import os",
+        "import json",
+        "import numpy as np",
+        "",
+        f"IMPRONTA = {impronta_ontologia()!r}",
+        f"CONCLUSIONI = {dict(CONCLUSIONI)!r}",
+        f"FUNZIONALI = {set(funzionali)!r}",
+        f"SOGLIE = {memoria.soglie!r}",
+        f"INDIVIDUI = {memoria.individui!r}",
+        'TABELLA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regole_compilate.json")',
+        SUPPORTO,
+        *corpo,
+        "",
+        f"# Tabella di decisione: {len(ordine)} firme, {len(combinazioni)} combinazioni distinte di conclusioni",
+        "TABELLA_FIRME, TABELLA_INDICI, TABELLA_CONCLUSIONI = _carica_tabella()",
+        "",
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(testo))
+    with open(os.path.splitext(path)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump({"impronta": impronta_ontologia(), "conclusioni": list(combinazioni),
+                   "firme": firme[ordine].tolist(), "indici": indici}, f, ensure_ascii=False)
+        f.write("\n")
+    print(f"💾 Regole compilate in {path}: {len(regole)} regole, {len(ordine)} firme nella tabella")
+    return path
+
+def carica_regole_compilate():
+    """
+    Importa onto/regole_compilate.py senza mai riscriverlo: se manca o se l'ontologia è cambiata
+    solleva un errore, il modulo si rigenera solo con python -m onto.compilatore_regole
+    """
+    try:
+        modulo = importlib.import_module("onto.regole_compilate")
+    except ImportError:
+        raise ImportError(f"{MODULO} non trovato: generalo con python -m onto.compilatore_regole") from None
+    if modulo.IMPRONTA != impronta_ontologia():
+        raise RuntimeError(f"{MODULO} è stato compilato da un'altra versione di onto/ontology.py: "
+                           f"rigeneralo con python -m onto.compilatore_regole")
+    return modulo
+
+def verifica_contro_pellet(frame, modulo=None):
+    """Confronta predicati compilati e tabella di decisione con Pellet; restituisce le righe diverse"""
+    from onto.motore_regole import verifica_contro_pellet as verifica, conclusioni_diverse
+    modulo = modulo or carica_regole_compilate()
+
+    class MotoreCompilato(MotoreRegole):
+        def conclusioni(self, frame):
+            return modulo.conclusioni(frame)
+
+    diverse = verifica(frame, MotoreCompilato())
+    tabella = conclusioni_diverse(modulo.conclusioni_da_tabella(frame), modulo.conclusioni(frame),
+                                  ("_tabella", "_compilato"))
+    return diverse, tabella
+
+if __name__ == "__main__":
+    genera_modulo()
+    if len(sys.argv) > 1:
+        from onto.motore_regole import frame_sintetico
+        n = int(sys.argv[1])
+        diverse, tabella = verifica_contro_pellet(frame_sintetico(n, seme=2))
+        if len(diverse) or len(tabella):
+            print(f"❌ Differenze su {n} tratti: {len(diverse)} con Pellet, {len(tabella)} tra tabella e predicati")
+            sys.exit(1)
+        print(f"✅ Predicati compilati e tabella di decisione identici a Pellet su {n} tratti")
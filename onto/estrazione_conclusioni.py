@@ -0,0 +1,113 @@
+"""Estrazione in blocco delle conclusioni inferite dal quadstore di owlready2.
+
+Leggere te.haStatoSicurezza, te.haTipoRischio e te.haRaccomandazione individuo per individuo
+costa tre query SQLite e la creazione degli oggetti Python di ogni valore: con batch grandi
+la lettura dei risultati pesa quanto il ragionamento. estrai_in_blocco legge le tre proprietà
+per tutti i TrattoStradale (o per gli individui indicati) con una sola query sulle tabelle
+objs / resources e costruisce il frame colonnare, senza caricare nessun individuo.
+
+Il frame ha una riga per individuo: segmento (nome dell'individuo), stato_sicurezza (nome o None),
+tipo_rischio e raccomandazioni (liste ordinate di nomi), come leggi_conclusioni.
+
+Confronto con la lettura per attributo (dalla radice del repository):
+    python -m onto.estrazione_conclusioni 2000
+"""
+
+import sys
+import pandas as pd
+from owlready2.base import rdf_type
+from onto.motore_regole import CONCLUSIONI
+
+PARAMETRI_SQL = 900 #variabili per query: sotto il limite di SQLite
+
+def _nome(iri):
+    """Come owlready2: il nome segue l'ultimo '#' (o l'ultimo '/' se non ce ne sono)"""
+    return iri.rsplit("#", 1)[1] if "#" in iri else iri.rsplit("/", 1)[-1]
+
+def _triple(grafo, proprietà, condizione, parametri):
+    """(soggetto, proprietà, valore) delle proprietà per i soggetti della condizione"""
+    return grafo.execute(f"SELECT t.s, t.p, t.o FROM objs t "
+                         f"WHERE t.p IN ({','.join('?' * len(proprietà))}) AND t.s IN ({condizione})",
+                         list(proprietà) + list(parametri)).fetchall()
+
+def estrai_in_blocco(ontologia, individui=None, classe="TrattoStradale"):
+    """
+    individui : individui da leggere, nell'ordine delle righe; di default tutti quelli della classe
+    Restituisce il frame (segmento, stato_sicurezza, tipo_rischio, raccomandazioni)
+    """
+    grafo = ontologia.world.graph
+    proprietà = {ontologia[p].storid: colonna for colonna, p in CONCLUSIONI.items()}
+    if individui is None:
+        membri = f"SELECT s FROM objs WHERE p={rdf_type} AND o={ontologia[classe].storid}"
+        soggetti = grafo.execute(f"SELECT r.storid, r.iri FROM resources r WHERE r.storid IN ({membri}) "
+                                 f"ORDER BY r.storid").fetchall()
+        triple = _triple(grafo, proprietà, membri, ())
+    else:
+        soggetti = [(t.storid, t.iri) for t in individui]
+        triple = []
+        for inizio in range(0, len(soggetti), PARAMETRI_SQL):
+            blocco = [s for s, _ in soggetti[inizio:inizio + PARAMETRI_SQL]]
+            triple += _triple(grafo, proprietà, ",".join("?" * len(blocco)), blocco)
+
+    stato, insiemi = {}, {"tipo_rischio": {}, "raccomandazioni": {}}
+    for s, p, o in triple:
+        if proprietà[p] == "stato_sicurezza":
+            stato.setdefault(s, o) #proprietà funzionale: come l'accesso per attributo (stesso indice s, p) vale il primo
+        else:
+            insiemi[proprietà[p]].setdefault(s, set()).add(o)
+
+    # pochi valori (e combinazioni di valori) distinti: nomi e ordinamenti si calcolano una volta sola
+    valori = {o for o in stato.values()} | {o for gruppo in insiemi.values() for v in gruppo.values() for o in v}
+    nomi = {o: _nome(iri) for o, iri in grafo.execute(
+        f"SELECT storid, iri FROM resources WHERE storid IN ({','.join(map(str, valori))})")}
+    ordinati = {}
+    def elenco(insieme):
+        chiave = frozenset(insieme)
+        if chiave not in ordinati:
+            ordinati[chiave] = sorted(nomi[o] for o in chiave)
+        return list(ordinati[chiave])
+
+    return pd.DataFrame({
+        "segmento": [_nome(iri) for _, iri in soggetti],
+        "stato_sicurezza": [nomi[stato[s]] if s in stato else None for s, _ in soggetti],
+        "tipo_rischio": [elenco(insiemi["tipo_rischio"].get(s, ())) for s, _ in soggetti],
+        "raccomandazioni": [elenco(insiemi["raccomandazioni"].get(s, ())) for s, _ in soggetti],
+    })
+
+if __name__ == "__main__":
+    import time
+    from owlready2 import sync_reasoner_pellet, destroy_entity
+    from onto.carica_ontologia import onto
+    from onto.motore_regole import frame_sintetico, conclusioni_diverse
+    from onto.popolamento_massivo import popola_in_blocco
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    frame = frame_sintetico(n)
+    individui = popola_in_blocco(frame, onto, [f"TrattoStradale_{i}" for i in range(n)])
+    sync_reasoner_pellet(onto.world, infer_property_values=True, infer_data_property_values=True, debug=0)
+
+    for te in individui: #nessun valore già in cache, come dopo il ragionamento di un batch
+        for proprietà in CONCLUSIONI.values():
+            te.__dict__.pop(proprietà, None)
+    inizio = time.perf_counter()
+    per_attributo = pd.DataFrame({
+        "stato_sicurezza": [t.haStatoSicurezza.name if t.haStatoSicurezza else None for t in individui],
+        "tipo_rischio": [sorted(r.name for r in t.haTipoRischio) for t in individui],
+        "raccomandazioni": [sorted(r.name for r in t.haRaccomandazione) for t in individui],
+    })
+    secondi_attributi = time.perf_counter() - inizio
+
+    inizio = time.perf_counter()
+    in_blocco = estrai_in_blocco(onto)
+    secondi_blocco = time.perf_counter() - inizio
+    print(f"⏱️  {n} tratti: per attributo {secondi_attributi * 1000:.0f}ms, in blocco {secondi_blocco * 1000:.0f}ms")
+
+    diverse = conclusioni_diverse(in_blocco.drop(columns="segmento"), per_attributo, ("_blocco", "_attributi"))
+    nomi_corretti = in_blocco["segmento"].tolist() == [t.name for t in individui]
+    for te in individui:
+        destroy_entity(te)
+    if len(diverse) or not nomi_corretti:
+        print(f"❌ {len(diverse)} tratti con conclusioni diverse dalla lettura per attributo "
+              f"(nomi corretti: {nomi_corretti}):\n{diverse}")
+        sys.exit(1)
+    print("✅ Conclusioni identiche alla lettura per attributo")
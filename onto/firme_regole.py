@@ -0,0 +1,138 @@
+"""Memoizzazione delle conclusioni per classi di equivalenza (firme) dei TrattoStradale.
+
+Le regole dell'ontologia guardano solo pochi confronti: haPericolo uguale a 0/1, la fascia di
+haPunteggioPericolo (<=0.4 / 0.4-0.8 / >0.8), se la curvatura supera 0.4 e 0.75, se
+haLimiteVelocità supera 60 e quali individui di meteo e illuminazione compaiono nelle regole.
+La firma di un tratto codifica esattamente questi confronti, ricavati dalle regole stesse:
+due tratti con la stessa firma hanno le stesse conclusioni. Si ragiona una volta per firma
+(su un tratto rappresentante) e il risultato viene distribuito a tutti i tratti che la condividono;
+le firme già viste restano in memoria tra una chiamata e l'altra.
+
+Sono considerate solo le regole da cui dipendono le conclusioni (CONCLUSIONI): ad esempio
+haTipoStrada serve solo al limite legale e non entra nella firma.
+"""
+
+import numpy as np
+from onto.motore_regole import MotoreRegole, CONCLUSIONI, popola_da_frame, leggi_conclusioni
+
+# confronto "variabile op costante": quale uguaglianza separa la fascia della soglia
+# sinistra: x > s (oppure x <= s) ; destra: x >= s (oppure x < s) ; entrambe: x == s / x != s
+LATO = {
+    "greaterThan": ("sinistra",),
+    "lessThanOrEqual": ("sinistra",),
+    "greaterThanOrEqual": ("destra",),
+    "lessThan": ("destra",),
+    "equal": ("sinistra", "destra"),
+    "notEqual": ("sinistra", "destra"),
+}
+INVERSO = {"greaterThan": "lessThan", "lessThan": "greaterThan", "greaterThanOrEqual": "lessThanOrEqual",
+           "lessThanOrEqual": "greaterThanOrEqual", "equal": "equal", "notEqual": "notEqual"}
+
+class MemoriaConclusioni(object):
+
+    def __init__(self, motore=None, ragionatore="pellet"):
+        """ragionatore : "pellet" (un sync_reasoner_pellet per i rappresentanti) oppure "nativo" """
+        self.motore = motore or MotoreRegole()
+        self.ontologia = self.motore.ontologia
+        self.ragionatore = ragionatore
+        self.regole = self._regole_rilevanti()
+        self.soglie, self.individui = self._confronti()
+        self.memoria = {}
+        self.chiamate_ragionatore = 0
+
+    def _regole_rilevanti(self):
+        """Regole da cui dipendono (anche indirettamente) le proprietà delle conclusioni"""
+        obiettivo, rilevanti = set(CONCLUSIONI.values()), []
+        cambiato = True
+        while cambiato:
+            cambiato = False
+            for regola in self.motore.regole:
+                if regola not in rilevanti and obiettivo & {p for _, p, _ in regola.testa}:
+                    rilevanti.append(regola)
+                    obiettivo |= {p for tipo, p, _ in regola.corpo if tipo != "classe" and p}
+                    cambiato = True
+        return rilevanti
+
+    def _confronti(self):
+        """Soglie (con il lato dell'uguaglianza) per ogni proprietà sui dati e individui per quelle oggetto"""
+        derivate = {p for regola in self.motore.regole for _, p, _ in regola.testa}
+        soglie, individui = {}, {}
+        for regola in self.regole:
+            legate = {}
+            for tipo, a, b in regola.corpo:
+                if a in derivate:
+                    continue
+                if tipo == "oggetto":
+                    individui.setdefault(a, set()).add(b)
+                elif tipo == "dato":
+                    soglie.setdefault(a, set()).update((float(b), lato) for lato in LATO["equal"])
+                elif tipo == "lega":
+                    legate[b] = a
+                    soglie.setdefault(a, set())
+                elif tipo == "confronto":
+                    (k1, v1), (k2, v2) = b
+                    if k1 == "variabile" and k2 == "costante" and v1 in legate:
+                        proprietà, operatore, soglia = legate[v1], a, v2
+                    elif k1 == "costante" and k2 == "variabile" and v2 in legate:
+                        proprietà, operatore, soglia = legate[v2], INVERSO[a], v1
+                    else:
+                        raise ValueError(f"confronto tra due variabili non supportato: {regola.nome}")
+                    soglie[proprietà].update((float(soglia), lato) for lato in LATO[operatore])
+        return ({p: sorted(s) for p, s in sorted(soglie.items())},
+                {p: sorted(i) for p, i in sorted(individui.items())})
+
+    def colonne(self):
+        """Colonne del frame che entrano nella firma"""
+        return list(self.soglie) + list(self.individui)
+
+    def firme(self, frame):
+        """Firma intera (codifica a base mista dei confronti) di ogni riga del frame"""
+        firma = np.zeros(len(frame), dtype=np.int64)
+        for proprietà, soglie in self.soglie.items():
+            valori = frame[proprietà].to_numpy(dtype=np.float64) if proprietà in frame else np.full(len(frame), np.nan)
+            codice = np.zeros(len(frame), dtype=np.int64)
+            for soglia, lato in soglie:
+                codice += valori > soglia if lato == "sinistra" else valori >= soglia
+            codice[np.isnan(valori)] = len(soglie) + 1
+            firma = firma * (len(soglie) + 2) + codice
+        for proprietà, nomi in self.individui.items():
+            valori = frame[proprietà].to_numpy() if proprietà in frame else np.full(len(frame), None)
+            codice = np.zeros(len(frame), dtype=np.int64) #0: individuo non nominato dalle regole
+            for k, nome in enumerate(nomi):
+                codice[valori == nome] = k + 1
+            firma = firma * (len(nomi) + 1) + codice
+        return firma
+
+    def conclusioni(self, frame):
+        """Stesso dataframe di MotoreRegole.conclusioni, con un ragionamento per firma non ancora vista"""
+        import pandas as pd
+        firme = self.firme(frame)
+        uniche, primo, inverso = np.unique(firme, return_index=True, return_inverse=True)
+        nuove = [k for k, firma in enumerate(uniche) if firma not in self.memoria]
+        if nuove:
+            rappresentanti = frame.iloc[primo[nuove]][[c for c in self.colonne() if c in frame]]
+            risultati = self._ragiona(rappresentanti.reset_index(drop=True))
+            for k, riga in zip(nuove, risultati.itertuples(index=False)):
+                self.memoria[uniche[k]] = tuple(riga)
+
+        righe = [self.memoria[firma] for firma in uniche]
+        colonne = {}
+        for j, nome in enumerate(CONCLUSIONI):
+            valori = np.empty(len(righe), dtype=object)
+            for k, riga in enumerate(righe):
+                valori[k] = riga[j]
+            colonne[nome] = valori[inverso.ravel()] #le righe con la stessa firma condividono le liste (sola lettura)
+        return pd.DataFrame(colonne, index=frame.index)
+
+    def _ragiona(self, rappresentanti):
+        self.chiamate_ragionatore += 1
+        if self.ragionatore == "nativo":
+            return self.motore.conclusioni(rappresentanti)
+        from owlready2 import sync_reasoner_pellet, destroy_entity
+        individui = popola_da_frame(rappresentanti, self.ontologia, prefisso="Firma")
+        with self.ontologia:
+            sync_reasoner_pellet(infer_property_values=True, infer_data_property_values=True, debug=0)
+        risultati = leggi_conclusioni(individui)
+        for te in individui:
+            destroy_entity(te)
+        return risultati
@@ -0,0 +1,141 @@
+// Pellet in un processo persistente per onto/pellet_persistente.py.
+//
+// All'avvio carica la parte fissa dell'ontologia (classi, proprieta', regole SWRL e individui
+// di riferimento) in N-Triples, poi resta in ascolto sullo standard input, un comando per riga:
+//   AGGIUNGI <n>          seguito da n righe N-Triples da aggiungere      -> OK
+//   RIMUOVI <iri> ...     toglie tutte le triple che hanno l'iri come soggetto -> OK
+//   RAGIONA <iri> ...     valori delle proprieta' (asseriti e inferiti) degli individui,
+//                         una riga per valore nello stesso formato dell'output di Pellet
+//                         letto da owlready2 (PROPINST: / DATAPROPVAL:), poi FINE
+//   ESCI
+// In caso di errore risponde con una sola riga ERRORE <messaggio>.
+//
+// Compilazione (dalla radice del repository, la fa anche onto/pellet_persistente.py):
+//   javac -cp <classpath di Pellet di owlready2> -d onto/java onto/java/PelletPersistente.java
+
+import java.io.BufferedOutputStream;
+import java.io.BufferedReader;
+import java.io.FileInputStream;
+import java.io.InputStream;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.io.StringReader;
+
+import org.mindswap.pellet.KnowledgeBase;
+import org.mindswap.pellet.jena.PelletInfGraph;
+import org.mindswap.pellet.jena.PelletReasonerFactory;
+import org.mindswap.pellet.utils.ATermUtils;
+
+import aterm.ATermAppl;
+
+import com.hp.hpl.jena.ontology.OntModel;
+import com.hp.hpl.jena.rdf.model.ModelFactory;
+import com.hp.hpl.jena.rdf.model.RDFNode;
+
+public class PelletPersistente {
+
+    private final OntModel modello;
+    private final PrintStream out;
+
+    public PelletPersistente(String ontologia, PrintStream out) throws Exception {
+        this.out = out;
+        modello = ModelFactory.createOntologyModel(PelletReasonerFactory.THE_SPEC);
+        InputStream in = new FileInputStream(ontologia);
+        try {
+            modello.read(in, null, "N-TRIPLE");
+        } finally {
+            in.close();
+        }
+        grafo().prepare();
+    }
+
+    private PelletInfGraph grafo() {
+        return (PelletInfGraph) modello.getGraph();
+    }
+
+    public void aggiungi(BufferedReader in, int righe) throws Exception {
+        StringBuilder triple = new StringBuilder();
+        for (int i = 0; i < righe; i++) {
+            triple.append(in.readLine()).append('\n');
+        }
+        // attraverso il modello inferito: Pellet riceve le modifiche (sul modello di base andrebbero perse)
+        modello.read(new StringReader(triple.toString()), null, "N-TRIPLE");
+        out.println("OK");
+    }
+
+    public void rimuovi(String[] iri) {
+        for (int i = 1; i < iri.length; i++) {
+            modello.removeAll(modello.getResource(iri[i]), null, (RDFNode) null);
+        }
+        out.println("OK");
+    }
+
+    public void ragiona(String[] iri) {
+        PelletInfGraph grafo = grafo();
+        grafo.prepare();
+        KnowledgeBase kb = grafo.getKB();
+        if (!kb.isConsistent()) {
+            out.println("ERRORE Ontology is inconsistent");
+            return;
+        }
+        for (int i = 1; i < iri.length; i++) {
+            ATermAppl individuo = ATermUtils.makeTermAppl(iri[i]);
+            if (!kb.isIndividual(individuo)) {
+                continue;
+            }
+            for (Object p : kb.getObjectProperties()) {
+                ATermAppl proprieta = (ATermAppl) p;
+                if (!ATermUtils.isPrimitive(proprieta) || proprieta.equals(ATermUtils.TOP_OBJECT_PROPERTY)
+                        || proprieta.equals(ATermUtils.BOTTOM_OBJECT_PROPERTY)) {
+                    continue;
+                }
+                for (Object v : kb.getObjectPropertyValues(proprieta, individuo)) {
+                    ATermAppl valore = (ATermAppl) v;
+                    if (!ATermUtils.isBnode(valore)) {
+                        out.println("PROPINST: " + iri[i] + " " + proprieta.getName() + " " + valore.getName());
+                    }
+                }
+            }
+            for (Object p : kb.getDataProperties()) {
+                ATermAppl proprieta = (ATermAppl) p;
+                if (!ATermUtils.isPrimitive(proprieta) || proprieta.equals(ATermUtils.TOP_DATA_PROPERTY)
+                        || proprieta.equals(ATermUtils.BOTTOM_DATA_PROPERTY)) {
+                    continue;
+                }
+                for (Object v : kb.getDataPropertyValues(proprieta, individuo)) {
+                    out.println("DATAPROPVAL: " + iri[i] + " " + proprieta.getName() + " " + v);
+                }
+            }
+        }
+        out.println("FINE");
+    }
+
+    public static void main(String[] args) throws Exception {
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, "UTF-8"));
+        PrintStream out = new PrintStream(new BufferedOutputStream(System.out), false, "UTF-8");
+        PelletPersistente pellet = new PelletPersistente(args[0], out);
+        out.println("PRONTO");
+        out.flush();
+
+        String riga;
+        while ((riga = in.readLine()) != null) {
+            String[] comando = riga.trim().split(" ");
+            try {
+                if (comando[0].equals("AGGIUNGI")) {
+                    pellet.aggiungi(in, Integer.parseInt(comando[1]));
+                } else if (comando[0].equals("RIMUOVI")) {
+                    pellet.rimuovi(comando);
+                } else if (comando[0].equals("RAGIONA")) {
+                    pellet.ragiona(comando);
+                } else if (comando[0].equals("ESCI")) {
+                    break;
+                } else {
+                    out.println("ERRORE comando sconosciuto: " + comando[0]);
+                }
+            } catch (Exception e) {
+                out.println("ERRORE " + String.valueOf(e).replace('\n', ' '));
+            }
+            out.flush();
+        }
+    }
+}
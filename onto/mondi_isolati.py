@@ -0,0 +1,101 @@
+"""Ragionamento partizionato su mondi owlready2 isolati, in processi paralleli.
+
+Tutta l'ontologia vive nel default_world e sync_reasoner_pellet ragiona sull'intero mondo:
+due ragionamenti non possono procedere insieme. RagionatoreMondi clona lo schema
+(classi, proprietà, regole SWRL e individui di riferimento, carica_ontologia.parte_fissa)
+in un World indipendente per ogni processo worker, divide i tratti in partizioni e ogni worker
+popola il proprio mondo e ci esegue il proprio Pellet. Le conclusioni tornano nell'ordine del frame.
+
+Le regole dell'ontologia riguardano un solo TrattoStradale alla volta (onto/motore_regole.py
+rifiuta quelle con più individui), quindi qualsiasi divisione delle righe dà le stesse
+conclusioni di un unico mondo.
+
+Confronto con un ragionamento in un unico mondo (dalla radice del repository):
+    python -m onto.mondi_isolati 2000 4
+"""
+
+import os
+import sys
+import numpy as np
+
+# Ontologia del World del processo worker, costruita una volta sola da _inizializza_mondo
+_ontologia_worker = []
+
+def _inizializza_mondo(schema):
+    import io
+    from owlready2 import World
+    from onto.carica_ontologia import IRI
+    mondo = World()
+    _ontologia_worker.append(mondo.get_ontology(IRI).load(fileobj=io.BytesIO(schema), format="ntriples"))
+
+def ragiona_nel_mondo(ontologia, frame, nomi):
+    """Popola il mondo dell'ontologia con i tratti del frame, ci ragiona con Pellet e li distrugge"""
+    from owlready2 import sync_reasoner_pellet, destroy_entity
+    from onto.motore_regole import leggi_conclusioni
+    from onto.popolamento_massivo import popola_in_blocco
+    individui = popola_in_blocco(frame, ontologia, nomi)
+    sync_reasoner_pellet(ontologia.world, infer_property_values=True, infer_data_property_values=True, debug=0)
+    conclusioni = leggi_conclusioni(individui, frame.index)
+    for te in individui:
+        destroy_entity(te)
+    return conclusioni
+
+def _ragiona_partizione(frame, nomi):
+    return ragiona_nel_mondo(_ontologia_worker[0], frame, nomi)
+
+class RagionatoreMondi(object):
+
+    def __init__(self, mondi=None, ontologia=None):
+        """mondi : numero di World (e di processi worker), di default uno per CPU"""
+        from onto.carica_ontologia import parte_fissa
+        self.mondi = mondi or os.cpu_count()
+        self.schema = parte_fissa(ontologia)
+        self.pool = None
+
+    def conclusioni(self, frame, nomi=None):
+        """
+        frame : una riga per tratto, colonne = proprietà (come MotoreRegole.conclusioni)
+        nomi : nomi degli individui, di default TrattoStradale_<posizione>
+        Stesso dataframe di MotoreRegole.conclusioni, con un Pellet per partizione
+        """
+        import pandas as pd
+        from concurrent.futures import ProcessPoolExecutor
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.mondi, initializer=_inizializza_mondo,
+                                            initargs=(self.schema,))
+        nomi = np.asarray(nomi if nomi is not None else [f"TrattoStradale_{i}" for i in range(len(frame))], dtype=object)
+        partizioni = [p for p in np.array_split(np.arange(len(frame)), self.mondi) if len(p)]
+        risultati = self.pool.map(_ragiona_partizione, [frame.iloc[p] for p in partizioni],
+                                  [list(nomi[p]) for p in partizioni])
+        return pd.concat(list(risultati))
+
+    def chiudi(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+        self.pool = None
+
+if __name__ == "__main__":
+    import time
+    from onto.carica_ontologia import onto
+    from onto.motore_regole import frame_sintetico, conclusioni_diverse
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    mondi = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    frame = frame_sintetico(n)
+
+    inizio = time.perf_counter()
+    unico = ragiona_nel_mondo(onto, frame, [f"TrattoStradale_{i}" for i in range(n)])
+    print(f"⏱️  Un solo mondo: {n} tratti in {time.perf_counter() - inizio:.2f}s")
+
+    ragionatore = RagionatoreMondi(mondi)
+    inizio = time.perf_counter()
+    partizionato = ragionatore.conclusioni(frame)
+    print(f"⏱️  {mondi} mondi isolati in parallelo: {n} tratti in {time.perf_counter() - inizio:.2f}s "
+          f"(CPU disponibili: {os.cpu_count()})")
+    ragionatore.chiudi()
+
+    diverse = conclusioni_diverse(partizionato, unico, ("_mondi", "_unico"))
+    if len(diverse):
+        print(f"❌ {len(diverse)} tratti con conclusioni diverse dal mondo unico:\n{diverse}")
+        sys.exit(1)
+    print("✅ Conclusioni identiche al ragionamento in un unico mondo")
@@ -0,0 +1,288 @@
+"""Motore di regole nativo (NumPy) per le regole SWRL di onto/ontology.py.
+
+Le regole dell'ontologia sono confronti con soglie e uguaglianze su un solo TrattoStradale:
+il motore legge gli stessi Imp da owlready2 e li valuta come maschere booleane su un frame
+colonnare (una riga per tratto, una colonna per proprietà), ripetendo tutte le regole fino
+al punto fisso. Nessun processo Java, nessun individuo creato nell'ontologia.
+
+Il frame ha come colonne i nomi delle proprietà: le proprietà oggetto contengono il nome
+dell'individuo (o None), quelle sui dati il valore (NaN se assente).
+Le regole che coinvolgono più individui (es. limite_velocità_ereditato) non sono supportate
+e vengono elencate in MotoreRegole.non_supportate.
+
+Confronto con Pellet su segmenti sintetici (dalla radice del repository):
+    python -m onto.motore_regole 500
+"""
+
+import sys
+import numpy as np
+from owlready2 import ClassAtom, IndividualPropertyAtom, DatavaluedPropertyAtom, BuiltinAtom, Variable, FunctionalProperty
+
+CONFRONTI = {
+    "greaterThan": np.greater,
+    "greaterThanOrEqual": np.greater_equal,
+    "lessThan": np.less,
+    "lessThanOrEqual": np.less_equal,
+    "equal": np.equal,
+    "notEqual": np.not_equal,
+}
+
+# colonna delle conclusioni -> proprietà inferita, come estrai_conclusioni
+CONCLUSIONI = {
+    "stato_sicurezza": "haStatoSicurezza",
+    "tipo_rischio": "haTipoRischio",
+    "raccomandazioni": "haRaccomandazione",
+}
+
+class RegolaNativa(object):
+    """Una regola SWRL su un solo individuo, tradotta in condizioni e conclusioni sulle colonne"""
+
+    def __init__(self, regola, classe):
+        self.nome = regola.name or str(regola) #gli Imp dell'ontologia non hanno nome
+        self.soggetto = None
+        self.corpo = [self._traduci(atomo, classe, corpo=True) for atomo in regola.body]
+        self.testa = [self._traduci(atomo, classe, corpo=False) for atomo in regola.head]
+
+    def _variabile_soggetto(self, argomento):
+        if not isinstance(argomento, Variable):
+            raise ValueError("il soggetto dell'atomo non è una variabile")
+        if self.soggetto is None:
+            self.soggetto = argomento.name
+        elif argomento.name != self.soggetto:
+            raise ValueError(f"la regola coinvolge più individui (?{self.soggetto}, ?{argomento.name})")
+
+    def _traduci(self, atomo, classe, corpo):
+        if isinstance(atomo, ClassAtom) and corpo:
+            self._variabile_soggetto(atomo.arguments[0])
+            if not issubclass(classe, atomo.class_predicate):
+                raise ValueError(f"classe {atomo.class_predicate.name} diversa da {classe.name}")
+            return ("classe", None, None)
+
+        if isinstance(atomo, IndividualPropertyAtom):
+            self._variabile_soggetto(atomo.arguments[0])
+            if isinstance(atomo.arguments[1], Variable):
+                raise ValueError(f"{atomo.property_predicate.name} lega un altro individuo")
+            return ("oggetto", atomo.property_predicate.name, atomo.arguments[1].name)
+
+        if isinstance(atomo, DatavaluedPropertyAtom):
+            self._variabile_soggetto(atomo.arguments[0])
+            valore = atomo.arguments[1]
+            if isinstance(valore, Variable):
+                return ("lega" if corpo else "copia", atomo.property_predicate.name, valore.name)
+            return ("dato", atomo.property_predicate.name, valore)
+
+        if isinstance(atomo, BuiltinAtom) and corpo and atomo.builtin in CONFRONTI:
+            argomenti = [("variabile", a.name) if isinstance(a, Variable) else ("costante", a)
+                         for a in atomo.arguments]
+            if len(argomenti) != 2:
+                raise ValueError(f"{atomo.builtin} con {len(argomenti)} argomenti")
+            return ("confronto", atomo.builtin, argomenti)
+
+        raise ValueError(f"atomo non supportato: {atomo}")
+
+    def valuta(self, oggetti, dati, n):
+        """Maschera delle righe che soddisfano il corpo e valori delle variabili sui dati"""
+        maschera = np.ones(n, dtype=bool)
+        variabili = {}
+        for tipo, a, b in self.corpo:
+            if tipo == "oggetto":
+                if (a, b) not in oggetti:
+                    return np.zeros(n, dtype=bool), variabili
+                maschera &= oggetti[(a, b)]
+            elif tipo == "dato":
+                maschera &= dati[a] == b if a in dati else False
+            elif tipo == "lega":
+                if a not in dati:
+                    return np.zeros(n, dtype=bool), variabili
+                variabili[b] = dati[a]
+                maschera &= ~np.isnan(dati[a])
+            elif tipo == "confronto":
+                sinistra, destra = [variabili[v] if k == "variabile" else v for k, v in b]
+                maschera &= CONFRONTI[a](sinistra, destra)
+        return maschera, variabili
+
+    def applica(self, oggetti, dati, n):
+        """Aggiunge le conclusioni della regola, restituisce True se qualcosa è cambiato"""
+        maschera, variabili = self.valuta(oggetti, dati, n)
+        if not maschera.any():
+            return False
+        cambiato = False
+        for tipo, a, b in self.testa:
+            if tipo == "oggetto":
+                vecchia = oggetti.get((a, b), np.zeros(n, dtype=bool))
+                cambiato |= bool((maschera & ~vecchia).any())
+                oggetti[(a, b)] = vecchia | maschera
+            else:
+                # proprietà funzionali sui dati: si riempiono solo i valori ancora assenti
+                colonna = dati.setdefault(a, np.full(n, np.nan))
+                nuovi = maschera & np.isnan(colonna)
+                if nuovi.any():
+                    colonna[nuovi] = variabili[b][nuovi] if tipo == "copia" else b
+                    cambiato = True
+        return cambiato
+
+class MotoreRegole(object):
+
+    def __init__(self, ontologia=None, classe=None):
+        if ontologia is None:
+            from onto.carica_ontologia import onto as ontologia
+        self.ontologia = ontologia
+        classe = classe or ontologia.TrattoStradale
+        self.regole, self.non_supportate = [], {}
+        for regola in ontologia.rules():
+            try:
+                self.regole.append(RegolaNativa(regola, classe))
+            except ValueError as e:
+                self.non_supportate[regola.name or str(regola)] = str(e)
+
+    def ragiona(self, frame):
+        """
+        frame : dataframe colonnare dei tratti (vedi docstring del modulo)
+        Restituisce (oggetti, dati): maschere (proprietà, individuo) -> bool e proprietà -> valori,
+        fatti di partenza più quelli inferiti
+        """
+        n = len(frame)
+        oggetti, dati = {}, {}
+        for colonna in frame.columns:
+            proprietà = self.ontologia[colonna]
+            if proprietà is None:
+                continue
+            valori = frame[colonna].to_numpy()
+            if self._è_oggetto(proprietà):
+                codici, nomi = _codifica(valori)
+                for k, nome in enumerate(nomi):
+                    oggetti[(colonna, nome)] = codici == k
+            else:
+                dati[colonna] = np.asarray(valori, dtype=np.float64)
+
+        # punto fisso: le regole sono monotone, ci si ferma quando un giro non aggiunge nulla
+        for _ in range(len(self.regole) + 1):
+            cambiato = False
+            for regola in self.regole:
+                cambiato |= regola.applica(oggetti, dati, n)
+            if not cambiato:
+                break
+        return oggetti, dati
+
+    def conclusioni(self, frame):
+        """Stesso dataframe di estrai_conclusioni (stato, rischi e raccomandazioni ordinati)"""
+        import pandas as pd
+        oggetti, _ = self.ragiona(frame)
+        colonne = {}
+        for nome_colonna, nome_proprietà in CONCLUSIONI.items():
+            funzionale = FunctionalProperty in self.ontologia[nome_proprietà].is_a
+            colonne[nome_colonna] = valori_oggetto(oggetti, nome_proprietà, len(frame), funzionale)
+        return pd.DataFrame(colonne, index=frame.index)
+
+    @staticmethod
+    def _è_oggetto(proprietà):
+        from owlready2 import ObjectProperty
+        return issubclass(proprietà, ObjectProperty)
+
+def _codifica(valori):
+    """Codici interi per i nomi degli individui di una colonna (-1 se assente)"""
+    import pandas as pd
+    codici, nomi = pd.factorize(valori)
+    return codici, [str(nome) for nome in nomi]
+
+def valori_oggetto(oggetti, proprietà, n, funzionale):
+    """Per ogni riga il nome dell'individuo (proprietà funzionale) o la lista ordinata dei nomi"""
+    nomi = sorted(nome for p, nome in oggetti if p == proprietà)
+    if funzionale:
+        return np.select([oggetti[(proprietà, nome)] for nome in nomi], nomi, default=None).tolist() \
+            if nomi else [None] * n
+
+    # righe con lo stesso insieme di valori condividono la stessa combinazione di bit
+    codice = np.zeros(n, dtype=np.int64)
+    for k, nome in enumerate(nomi):
+        codice |= oggetti[(proprietà, nome)].astype(np.int64) << k
+    combinazioni, inverso = np.unique(codice, return_inverse=True)
+    liste = np.empty(len(combinazioni), dtype=object)
+    for j, c in enumerate(combinazioni):
+        liste[j] = [nome for k, nome in enumerate(nomi) if c >> k & 1]
+    return liste[inverso.ravel()] #le righe con la stessa combinazione condividono la lista (sola lettura)
+
+def popola_da_frame(frame, ontologia, prefisso="Verifica"):
+    """Crea un TrattoStradale per riga del frame, con le stesse proprietà (per il confronto con Pellet)"""
+    individui = []
+    for i, riga in enumerate(frame.to_dict("records")):
+        te = ontologia.TrattoStradale(f"{prefisso}_{i}")
+        for colonna, valore in riga.items():
+            if valore is None or valore != valore:
+                continue
+            if MotoreRegole._è_oggetto(ontologia[colonna]):
+                setattr(te, colonna, ontologia[valore])
+            else:
+                tipo = ontologia[colonna].range[0]
+                setattr(te, colonna, tipo(valore) if tipo in (int, float) else valore)
+        individui.append(te)
+    return individui
+
+def leggi_conclusioni(individui, indice=None):
+    """
+    Conclusioni inferite sugli individui, nello stesso formato di MotoreRegole.conclusioni
+    (una sola query sul quadstore, onto/estrazione_conclusioni.py)
+    """
+    import pandas as pd
+    from onto.estrazione_conclusioni import estrai_in_blocco
+    if not len(individui):
+        return pd.DataFrame({colonna: [] for colonna in CONCLUSIONI}, index=indice, dtype=object)
+    conclusioni = estrai_in_blocco(individui[0].namespace.ontology, individui).drop(columns="segmento")
+    return conclusioni.set_axis(indice if indice is not None else conclusioni.index)
+
+def conclusioni_diverse(prime, seconde, suffissi=("_nativo", "_pellet")):
+    """Righe in cui due dataframe di conclusioni differiscono, affiancate"""
+    import pandas as pd
+    diverse = (prime.map(str) != seconde.map(str)).any(axis=1)
+    return pd.concat([prime[diverse].add_suffix(suffissi[0]), seconde[diverse].add_suffix(suffissi[1])], axis=1)
+
+def verifica_contro_pellet(frame, motore=None):
+    """
+    Test differenziale: ragiona sullo stesso frame con Pellet e con il motore nativo.
+    Restituisce le righe con conclusioni diverse (dataframe vuoto se coincidono).
+    """
+    from owlready2 import sync_reasoner_pellet, destroy_entity
+    motore = motore or MotoreRegole()
+    native = motore.conclusioni(frame)
+
+    individui = popola_da_frame(frame, motore.ontologia)
+    with motore.ontologia:
+        sync_reasoner_pellet(infer_property_values=True, infer_data_property_values=True, debug=0)
+    pellet = leggi_conclusioni(individui, frame.index)
+    for te in individui:
+        destroy_entity(te)
+
+    return conclusioni_diverse(native, pellet)
+
+def frame_sintetico(n, seme=0):
+    """Tratti casuali con valori anche esattamente sulle soglie delle regole"""
+    import pandas as pd
+    rng = np.random.default_rng(seme)
+    return pd.DataFrame({
+        "haTipoStrada": rng.choice(["Autostrada", "Urbana", "Rurale"], n),
+        "haCondizioniMeteo": rng.choice(["Sole", "Pioggia", "Nebbia"], n),
+        "haIlluminazione": rng.choice(np.array(["Diurno", "Notturno", "Penombra", None], dtype=object), n),
+        "haCurvatura": rng.choice([0.0, 0.2, 0.4, 0.41, 0.75, 0.76, 1.0], n),
+        "haLimiteVelocità": rng.choice([40, 56, 60, 61, 72, 96, 112], n),
+        "haSegnaletica": rng.integers(0, 2, n),
+        "haPericolo": rng.integers(0, 2, n),
+        "haPunteggioPericolo": rng.choice([0.1, 0.4, 0.41, 0.6, 0.8, 0.81, 0.95], n),
+    })
+
+if __name__ == "__main__":
+    import time
+    motore = MotoreRegole()
+    for nome, motivo in motore.non_supportate.items():
+        print(f"⚠️  Regola {nome} non supportata: {motivo}")
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    diverse = verifica_contro_pellet(frame_sintetico(n))
+    if len(diverse):
+        print(f"❌ {len(diverse)} tratti su {n} con conclusioni diverse da Pellet:\n{diverse}")
+        sys.exit(1)
+    print(f"✅ Conclusioni identiche a Pellet su {n} tratti")
+
+    frame = frame_sintetico(1_000_000, seme=1)
+    inizio = time.perf_counter()
+    motore.ragiona(frame)
+    print(f"⏱️  Ragionamento nativo su {len(frame)} tratti: {time.perf_counter() - inizio:.3f}s")
@@ -1,5 +1,6 @@
 from owlready2 import get_ontology, Thing, DatatypeProperty, FunctionalProperty, ObjectProperty, AllDifferent, Imp
 
+#Non importare direttamente: onto/carica_ontologia.py usa lo snapshot precompilato se aggiornato
 onto = get_ontology("http://safedrive.it/ontology.owl")
 
 with onto:
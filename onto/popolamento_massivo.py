@@ -0,0 +1,93 @@
+"""Popolamento in blocco dei TrattoStradale: triple scritte direttamente nel quadstore di owlready2.
+
+Assegnare una proprietà a un individuo (te.haCurvatura = ...) è una scrittura SQLite con la
+relativa gestione Python (cache dell'attributo, DELETE del valore precedente, contatori):
+con ~9 proprietà per segmento il popolamento di un batch grande costa più del ragionamento.
+popola_in_blocco riceve il frame colonnare di onto/motore_regole.py (una colonna per proprietà,
+individui indicati per nome) e inserisce tipi e valori con pochi executemany nella stessa
+transazione del quadstore; gli individui Python vengono caricati solo alla fine.
+Gli storid dei nuovi individui vengono comunque allocati da owlready2 (World._abbreviate),
+sotto il lock di scrittura del mondo, e non viene eseguito ANALYZE: le statistiche del
+quadstore restano a owlready2 o al chiamante (grafo.analyze(), una volta sola dopo un grande carico).
+
+Come con l'assegnazione, un tratto già esistente (stesso nome) viene aggiornato: i valori
+precedenti delle proprietà del frame vengono cancellati, quelli mancanti (None/NaN) restano vuoti.
+
+Confronto con il popolamento per attributo (dalla radice del repository):
+    python benchmarks/bench_popolamento.py
+"""
+
+import numpy as np
+from owlready2 import ObjectProperty
+from owlready2.base import rdf_type, owl_named_individual, to_literal
+
+PARAMETRI_SQL = 900 #variabili per query: sotto il limite di SQLite
+
+def _storid_esistenti(grafo, iri):
+    """storid delle iri già presenti tra le risorse del quadstore"""
+    esistenti = {}
+    for inizio in range(0, len(iri), PARAMETRI_SQL):
+        blocco = iri[inizio:inizio + PARAMETRI_SQL]
+        esistenti.update(grafo.execute(f"SELECT iri, storid FROM resources WHERE iri IN ({','.join('?' * len(blocco))})",
+                                       blocco).fetchall())
+    return esistenti
+
+def _storid_nuovi(mondo, iri):
+    """Registra le nuove risorse con l'allocatore di storid di owlready2 (da chiamare con il lock di scrittura)"""
+    return {i: mondo._abbreviate(i) for i in iri}
+
+def _valori(ontologia, proprietà, colonna):
+    """(storid soggetto -> valore) da inserire: storid dell'individuo per le proprietà oggetto, (o, d) per quelle sui dati"""
+    presenti = np.array([valore is not None and valore == valore for valore in colonna], dtype=bool)
+    if issubclass(proprietà, ObjectProperty):
+        storid = {nome: ontologia[nome].storid for nome in set(colonna[presenti])}
+        return presenti, [storid[nome] for nome in colonna[presenti]]
+    tipo = proprietà.range[0]
+    converti = tipo if tipo in (int, float) else (lambda v: v)
+    return presenti, [to_literal(converti(valore)) for valore in colonna[presenti]]
+
+def popola_in_blocco(frame, ontologia, nomi, classe="TrattoStradale"):
+    """
+    frame : una riga per individuo, colonne = nomi delle proprietà (come frame_ontologia / frame_sintetico)
+    nomi : nome dell'individuo di ogni riga
+    Restituisce gli individui, nell'ordine delle righe.
+    """
+    mondo, grafo = ontologia.world, ontologia.graph
+    iri = [ontologia.base_iri + nome for nome in nomi]
+    proprietà = {colonna: ontologia[colonna] for colonna in frame.columns}
+
+    grafo.parent.acquire_write_lock()
+    try:
+        esistenti = _storid_esistenti(grafo, iri)
+        nuovi = _storid_nuovi(mondo, [i for i in dict.fromkeys(iri) if i not in esistenti])
+        soggetti = np.array([esistenti.get(i) or nuovi[i] for i in iri], dtype=np.int64)
+        #nomi ripetuti nel frame: come con assegnazioni successive vale l'ultima riga
+        ultime = np.zeros(len(iri), dtype=bool)
+        ultime[len(iri) - 1 - np.unique(soggetti[::-1], return_index=True)[1]] = True
+
+        # individui nuovi: tipo NamedIndividual e classe
+        c, tipo_classe = grafo.c, ontologia[classe].storid
+        grafo.db.executemany(f"INSERT INTO objs VALUES ({c},?,{rdf_type},?)",
+                             [(s, o) for s in nuovi.values() for o in (owl_named_individual, tipo_classe)])
+
+        # individui esistenti: i valori precedenti vengono sostituiti
+        vecchi = [(s, p.storid) for s in esistenti.values() for p in proprietà.values()]
+        grafo.db.executemany("DELETE FROM objs WHERE s=? AND p=?", vecchi)
+        grafo.db.executemany("DELETE FROM datas WHERE s=? AND p=?", vecchi)
+
+        for colonna, prop in proprietà.items():
+            presenti, valori = _valori(ontologia, prop, frame[colonna].to_numpy(dtype=object)[ultime])
+            if issubclass(prop, ObjectProperty):
+                grafo.db.executemany(f"INSERT INTO objs VALUES ({c},?,{prop.storid},?)",
+                                     zip(soggetti[ultime][presenti].tolist(), valori))
+            else:
+                grafo.db.executemany(f"INSERT INTO datas VALUES ({c},?,{prop.storid},?,?)",
+                                     ((s, o, d) for s, (o, d) in zip(soggetti[ultime][presenti].tolist(), valori)))
+    finally:
+        grafo.parent.release_write_lock()
+
+    individui = [mondo._get_by_storid(s) for s in soggetti.tolist()]
+    for te in individui:
+        for colonna in proprietà: #individui già caricati: i valori in cache non sono più validi
+            te.__dict__.pop(colonna, None)
+    return individui
@@ -0,0 +1,134 @@
+"""Ragionamento incrementale sui TrattoStradale cambiati dall'ultimo passaggio.
+
+sync_reasoner_pellet ragiona ogni volta sull'intero mondo: per un aggiornamento in diretta
+(meteo o predizioni di pochi segmenti) il costo cresce con la rete, non con il cambiamento.
+RagionatoreIncrementale tiene l'elenco dei tratti aggiunti, modificati o rimossi; a ogni
+ragiona() ritratta le proprietà inferite (quelle nella testa delle regole) solo per quei tratti
+e per i loro vicini (adiacente), poi le ricava di nuovo con il motore nativo di onto/motore_regole.py.
+
+Le proprietà nella testa delle regole sono considerate solo inferite: non vanno asserite a mano.
+
+Confronto con un ragionamento completo (dalla radice del repository):
+    python -m onto.ragionamento_incrementale 5000
+"""
+
+import sys
+import numpy as np
+from owlready2 import FunctionalProperty, ObjectProperty, destroy_entity
+from onto.motore_regole import MotoreRegole, valori_oggetto
+
+class RagionatoreIncrementale(object):
+
+    def __init__(self, motore=None, distruggi=destroy_entity):
+        """distruggi : funzione che elimina un tratto rimosso (es. per toglierlo anche dai registri del chiamante)"""
+        self.motore = motore or MotoreRegole()
+        self.distruggi = distruggi
+        self.ontologia = self.motore.ontologia
+        self.derivate = sorted({proprietà for regola in self.motore.regole for _, proprietà, _ in regola.testa})
+        self.asserite = sorted({proprietà for regola in self.motore.regole for tipo, proprietà, _ in regola.corpo
+                                if tipo in ("oggetto", "dato", "lega")} - set(self.derivate))
+        self.sporchi = set()
+
+    def aggiunto(self, te):
+        self.sporchi.add(te)
+
+    def modificato(self, te):
+        self.sporchi.add(te)
+
+    def rimosso(self, te):
+        """Distrugge il tratto: i suoi vicini vanno rivalutati al prossimo passaggio"""
+        self.sporchi.update(self.vicini(te))
+        self.sporchi.discard(te)
+        self.distruggi(te)
+
+    def ragiona(self):
+        """Ritratta e ricava di nuovo le conclusioni dei tratti cambiati e dei loro vicini, li restituisce"""
+        individui = set(self.sporchi)
+        for te in self.sporchi:
+            individui.update(self.vicini(te))
+        individui = sorted(individui, key=lambda te: te.name)
+        self.sporchi = set()
+        if not individui:
+            return []
+
+        for te in individui:
+            self._ritratta(te)
+
+        oggetti, dati = self.motore.ragiona(self.frame(individui))
+        for proprietà in self.derivate:
+            self._scrivi(individui, proprietà, oggetti, dati)
+        return individui
+
+    def vicini(self, te):
+        """Tratti adiacenti in entrambe le direzioni (adiacente non è dichiarata SymmetricProperty)"""
+        return set(te.adiacente) | set(self.ontologia.search(adiacente=te))
+
+    def frame(self, individui):
+        """Frame colonnare dei fatti asseriti (non inferiti) degli individui, per il motore nativo"""
+        import pandas as pd
+        return pd.DataFrame({proprietà: [self._valore(te, proprietà) for te in individui]
+                             for proprietà in self.asserite})
+
+    def _funzionale(self, proprietà):
+        return FunctionalProperty in self.ontologia[proprietà].is_a
+
+    def _ritratta(self, te):
+        for proprietà in self.derivate:
+            setattr(te, proprietà, None if self._funzionale(proprietà) else [])
+
+    def _valore(self, te, proprietà):
+        valore = getattr(te, proprietà)
+        if issubclass(self.ontologia[proprietà], ObjectProperty):
+            return valore.name if valore is not None else None
+        return valore if valore is not None else np.nan
+
+    def _scrivi(self, individui, proprietà, oggetti, dati):
+        if issubclass(self.ontologia[proprietà], ObjectProperty):
+            valori = valori_oggetto(oggetti, proprietà, len(individui), self._funzionale(proprietà))
+            for te, valore in zip(individui, valori):
+                if self._funzionale(proprietà):
+                    setattr(te, proprietà, self.ontologia[valore] if valore is not None else None)
+                elif valore:
+                    setattr(te, proprietà, [self.ontologia[nome] for nome in valore])
+        elif proprietà in dati:
+            tipo = self.ontologia[proprietà].range[0]
+            for te, valore in zip(individui, dati[proprietà]):
+                if not np.isnan(valore):
+                    setattr(te, proprietà, tipo(valore))
+
+if __name__ == "__main__":
+    import time
+    from owlready2 import sync_reasoner_pellet
+    from onto.motore_regole import popola_da_frame, frame_sintetico, leggi_conclusioni, conclusioni_diverse
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    frame = frame_sintetico(n)
+    ragionatore = RagionatoreIncrementale()
+    rete = popola_da_frame(frame, ragionatore.ontologia, prefisso="Rete")
+    for a, b in zip(rete, rete[1:]):
+        a.adiacente.append(b)
+
+    inizio = time.perf_counter()
+    with ragionatore.ontologia:
+        sync_reasoner_pellet(infer_property_values=True, infer_data_property_values=True, debug=0)
+    print(f"⏱️  Ragionamento completo con Pellet su {n} tratti: {time.perf_counter() - inizio:.2f}s")
+
+    # aggiornamento in diretta: cambiano meteo e predizioni di pochi tratti, uno viene rimosso
+    for te in rete[10:15]:
+        te.haCondizioniMeteo = ragionatore.ontologia.Nebbia
+        te.haPericolo = 1
+        te.haPunteggioPericolo = 0.9
+        ragionatore.modificato(te)
+    ragionatore.rimosso(rete.pop(20))
+
+    inizio = time.perf_counter()
+    rivalutati = ragionatore.ragiona()
+    print(f"⏱️  Ragionamento incrementale: {len(rivalutati)} tratti in {time.perf_counter() - inizio:.4f}s")
+
+    # il risultato deve coincidere con un ragionamento completo sulla rete aggiornata
+    attese = ragionatore.motore.conclusioni(ragionatore.frame(rete))
+    diverse = conclusioni_diverse(leggi_conclusioni(rete), attese, ("_incrementale", "_completo"))
+    if len(diverse):
+        print(f"❌ {len(diverse)} tratti con conclusioni diverse dal ragionamento completo:\n{diverse}")
+        sys.exit(1)
+    print("✅ Conclusioni identiche al ragionamento completo")
@@ -0,0 +1,218 @@
+"""Regole SWRL di onto/ontology.py compilate in predicati NumPy e in una tabella di decisione.
+
+Generato da onto/compilatore_regole.py: non modificare a mano.
+La tabella di decisione è in regole_compilate.json, accanto a questo file.
+"""
+
+import os
+import json
+import numpy as np
+
+IMPRONTA = '46244629bdc2a9fc7830932a0715f7d54f7fad74c1ef56139b74fbc782c38931'
+CONCLUSIONI = {'stato_sicurezza': 'haStatoSicurezza', 'tipo_rischio': 'haTipoRischio', 'raccomandazioni': 'haRaccomandazione'}
+FUNZIONALI = {'haStatoSicurezza'}
+SOGLIE = {'haCurvatura': [(0.4, 'sinistra'), (0.75, 'sinistra')], 'haLimiteVelocità': [(60.0, 'sinistra')], 'haPericolo': [(0.0, 'destra'), (0.0, 'sinistra'), (1.0, 'destra'), (1.0, 'sinistra')], 'haPunteggioPericolo': [(0.4, 'sinistra'), (0.8, 'sinistra')]}
+INDIVIDUI = {'haCondizioniMeteo': ['Nebbia', 'Pioggia', 'Sole'], 'haIlluminazione': ['Diurno', 'Notturno']}
+TABELLA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regole_compilate.json")
+
+def _righe(colonne):
+    return len(colonne.index) if hasattr(colonne, "index") else len(next(iter(colonne.values())))
+
+def _maschera(colonne, proprietà, individuo, n):
+    if proprietà not in colonne:
+        return np.zeros(n, dtype=bool)
+    return np.asarray(colonne[proprietà], dtype=object) == individuo
+
+def _dati(colonne, proprietà, n):
+    if proprietà not in colonne:
+        return np.full(n, np.nan)
+    return np.array(colonne[proprietà], dtype=np.float64)
+
+def firma(colonne):
+    """Firma intera di ogni riga, identica a MemoriaConclusioni.firme"""
+    n = _righe(colonne)
+    codice_firma = np.zeros(n, dtype=np.int64)
+    for proprietà, soglie in SOGLIE.items():
+        valori = _dati(colonne, proprietà, n)
+        codice = np.zeros(n, dtype=np.int64)
+        for soglia, lato in soglie:
+            codice += valori > soglia if lato == "sinistra" else valori >= soglia
+        codice[np.isnan(valori)] = len(soglie) + 1
+        codice_firma = codice_firma * (len(soglie) + 2) + codice
+    for proprietà, nomi in INDIVIDUI.items():
+        valori = np.asarray(colonne[proprietà], dtype=object) if proprietà in colonne else np.full(n, None)
+        codice = np.zeros(n, dtype=np.int64)
+        for k, nome in enumerate(nomi):
+            codice[valori == nome] = k + 1
+        codice_firma = codice_firma * (len(nomi) + 1) + codice
+    return codice_firma
+
+def _valori_oggetto(oggetti, proprietà, n):
+    nomi = sorted(nome for p, nome in oggetti if p == proprietà)
+    if proprietà in FUNZIONALI:
+        return np.select([oggetti[(proprietà, nome)] for nome in nomi], nomi, default=None).tolist() \
+            if nomi else [None] * n
+    codice = np.zeros(n, dtype=np.int64)
+    for k, nome in enumerate(nomi):
+        codice |= oggetti[(proprietà, nome)].astype(np.int64) << k
+    combinazioni, inverso = np.unique(codice, return_inverse=True)
+    liste = np.empty(len(combinazioni), dtype=object)
+    for j, c in enumerate(combinazioni):
+        liste[j] = [nome for k, nome in enumerate(nomi) if c >> k & 1]
+    return liste[inverso.ravel()]
+
+def conclusioni(colonne):
+    """Dataframe stato_sicurezza / tipo_rischio / raccomandazioni, come MotoreRegole.conclusioni"""
+    import pandas as pd
+    oggetti, _ = ragiona(colonne)
+    n = _righe(colonne)
+    return pd.DataFrame({nome: _valori_oggetto(oggetti, proprietà, n) for nome, proprietà in CONCLUSIONI.items()},
+                        index=getattr(colonne, "index", None))
+
+def _carica_tabella(path=TABELLA):
+    """Tabella di decisione scritta da onto/compilatore_regole.py accanto a questo modulo"""
+    with open(path, encoding="utf-8") as f:
+        tabella = json.load(f)
+    if tabella["impronta"] != IMPRONTA:
+        raise RuntimeError(f"{path} non corrisponde a questo modulo: rigenera con python -m onto.compilatore_regole")
+    return (np.array(tabella["firme"], dtype=np.int64), np.array(tabella["indici"], dtype=np.intp),
+            tabella["conclusioni"])
+
+def conclusioni_da_tabella(colonne):
+    """Stesse conclusioni lette dalla tabella di decisione: una ricerca per riga"""
+    import pandas as pd
+    combinazione = TABELLA_INDICI[np.searchsorted(TABELLA_FIRME, firma(colonne))]
+    colonne_tabella = {}
+    for j, nome in enumerate(CONCLUSIONI):
+        tabella = np.empty(len(TABELLA_CONCLUSIONI), dtype=object)
+        for k, valori in enumerate(TABELLA_CONCLUSIONI):
+            tabella[k] = valori[j] if isinstance(valori[j], str) or valori[j] is None else list(valori[j])
+        colonne_tabella[nome] = tabella[combinazione]
+    return pd.DataFrame(colonne_tabella, index=getattr(colonne, "index", None))
+
+def ragiona(colonne):
+    """colonne : dataframe o dizionario proprietà -> valori (nomi degli individui per le proprietà oggetto)"""
+    n = _righe(colonne)
+    haCondizioniMeteo__Nebbia = _maschera(colonne, 'haCondizioniMeteo', 'Nebbia', n)
+    haCondizioniMeteo__Pioggia = _maschera(colonne, 'haCondizioniMeteo', 'Pioggia', n)
+    haCondizioniMeteo__Sole = _maschera(colonne, 'haCondizioniMeteo', 'Sole', n)
+    haIlluminazione__Diurno = _maschera(colonne, 'haIlluminazione', 'Diurno', n)
+    haIlluminazione__Notturno = _maschera(colonne, 'haIlluminazione', 'Notturno', n)
+    haRaccomandazione__AumentareDistanzaSicurezza = _maschera(colonne, 'haRaccomandazione', 'AumentareDistanzaSicurezza', n)
+    haRaccomandazione__ControllaFariAccesi = _maschera(colonne, 'haRaccomandazione', 'ControllaFariAccesi', n)
+    haRaccomandazione__Normale = _maschera(colonne, 'haRaccomandazione', 'Normale', n)
+    haRaccomandazione__PrestareAttenzione = _maschera(colonne, 'haRaccomandazione', 'PrestareAttenzione', n)
+    haRaccomandazione__ProtezioneLuminosa = _maschera(colonne, 'haRaccomandazione', 'ProtezioneLuminosa', n)
+    haRaccomandazione__Rallentare = _maschera(colonne, 'haRaccomandazione', 'Rallentare', n)
+    haStatoSicurezza__Pericolo = _maschera(colonne, 'haStatoSicurezza', 'Pericolo', n)
+    haStatoSicurezza__PericoloEstremo = _maschera(colonne, 'haStatoSicurezza', 'PericoloEstremo', n)
+    haStatoSicurezza__Sicuro = _maschera(colonne, 'haStatoSicurezza', 'Sicuro', n)
+    haTipoRischio__RischioCurvatura = _maschera(colonne, 'haTipoRischio', 'RischioCurvatura', n)
+    haTipoRischio__RischioLuminosità = _maschera(colonne, 'haTipoRischio', 'RischioLuminosità', n)
+    haTipoRischio__RischioVelocità = _maschera(colonne, 'haTipoRischio', 'RischioVelocità', n)
+    haTipoRischio__RischioVisibilità = _maschera(colonne, 'haTipoRischio', 'RischioVisibilità', n)
+    haTipoStrada__Autostrada = _maschera(colonne, 'haTipoStrada', 'Autostrada', n)
+    haTipoStrada__Rurale = _maschera(colonne, 'haTipoStrada', 'Rurale', n)
+    haTipoStrada__Urbana = _maschera(colonne, 'haTipoStrada', 'Urbana', n)
+    haCurvatura = _dati(colonne, 'haCurvatura', n)
+    haLimiteVelocità = _dati(colonne, 'haLimiteVelocità', n)
+    haLimiteVelocitàLegale = _dati(colonne, 'haLimiteVelocitàLegale', n)
+    haPericolo = _dati(colonne, 'haPericolo', n)
+    haPunteggioPericolo = _dati(colonne, 'haPunteggioPericolo', n)
+
+    # Strada(?s), haTipoStrada(?s, ontology.Rurale) -> haLimiteVelocitàLegale(?s, 90)
+    m = haTipoStrada__Rurale
+    haLimiteVelocitàLegale = np.where(m & np.isnan(haLimiteVelocitàLegale), 90, haLimiteVelocitàLegale)
+    # Strada(?s), haTipoStrada(?s, ontology.Urbana) -> haLimiteVelocitàLegale(?s, 50)
+    m = haTipoStrada__Urbana
+    haLimiteVelocitàLegale = np.where(m & np.isnan(haLimiteVelocitàLegale), 50, haLimiteVelocitàLegale)
+    # Strada(?s), haTipoStrada(?s, ontology.Autostrada) -> haLimiteVelocitàLegale(?s, 130)
+    m = haTipoStrada__Autostrada
+    haLimiteVelocitàLegale = np.where(m & np.isnan(haLimiteVelocitàLegale), 130, haLimiteVelocitàLegale)
+    # TrattoStradale(?t), haPericolo(?t, 1), haIlluminazione(?t, ontology.Diurno), haCondizioniMeteo(?t, ontology.Sole) -> haTipoRischio(?t, ontology.RischioLuminosità)
+    m = (haPericolo == 1) & haIlluminazione__Diurno & haCondizioniMeteo__Sole
+    haTipoRischio__RischioLuminosità = haTipoRischio__RischioLuminosità | m
+    # TrattoStradale(?t), haPericolo(?t, 1), haLimiteVelocità(?t, ?l), greaterThan(?l, 60) -> haTipoRischio(?t, ontology.RischioVelocità)
+    m = (haPericolo == 1) & ~np.isnan(haLimiteVelocità) & (haLimiteVelocità > 60)
+    haTipoRischio__RischioVelocità = haTipoRischio__RischioVelocità | m
+    # TrattoStradale(?t), haPericolo(?t, 0), haCurvatura(?t, ?c), greaterThan(?c, 0.75) -> haTipoRischio(?t, ontology.RischioCurvatura)
+    m = (haPericolo == 0) & ~np.isnan(haCurvatura) & (haCurvatura > 0.75)
+    haTipoRischio__RischioCurvatura = haTipoRischio__RischioCurvatura | m
+    # TrattoStradale(?t), haPericolo(?t, 1), haCurvatura(?t, ?c), greaterThan(?c, 0.4) -> haTipoRischio(?t, ontology.RischioCurvatura)
+    m = (haPericolo == 1) & ~np.isnan(haCurvatura) & (haCurvatura > 0.4)
+    haTipoRischio__RischioCurvatura = haTipoRischio__RischioCurvatura | m
+    # TrattoStradale(?t), haPericolo(?t, 1), haCondizioniMeteo(?t, ontology.Nebbia) -> haTipoRischio(?t, ontology.RischioVisibilità)
+    m = (haPericolo == 1) & haCondizioniMeteo__Nebbia
+    haTipoRischio__RischioVisibilità = haTipoRischio__RischioVisibilità | m
+    # TrattoStradale(?t), haPericolo(?t, 1), haCondizioniMeteo(?t, ontology.Pioggia) -> haTipoRischio(?t, ontology.RischioVisibilità)
+    m = (haPericolo == 1) & haCondizioniMeteo__Pioggia
+    haTipoRischio__RischioVisibilità = haTipoRischio__RischioVisibilità | m
+    # TrattoStradale(?t), haPericolo(?t, 1), haIlluminazione(?t, ontology.Notturno) -> haTipoRischio(?t, ontology.RischioVisibilità)
+    m = (haPericolo == 1) & haIlluminazione__Notturno
+    haTipoRischio__RischioVisibilità = haTipoRischio__RischioVisibilità | m
+    # TrattoStradale(?t), haPericolo(?t, 1), haPunteggioPericolo(?t, ?p), greaterThan(?p, 0.8) -> haStatoSicurezza(?t, ontology.PericoloEstremo)
+    m = (haPericolo == 1) & ~np.isnan(haPunteggioPericolo) & (haPunteggioPericolo > 0.8)
+    haStatoSicurezza__PericoloEstremo = haStatoSicurezza__PericoloEstremo | m
+    # TrattoStradale(?t), haPericolo(?t, 1), haPunteggioPericolo(?t, ?p), greaterThan(?p, 0.4), lessThanOrEqual(?p, 0.8) -> haStatoSicurezza(?t, ontology.Pericolo)
+    m = (haPericolo == 1) & ~np.isnan(haPunteggioPericolo) & (haPunteggioPericolo > 0.4) & (haPunteggioPericolo <= 0.8)
+    haStatoSicurezza__Pericolo = haStatoSicurezza__Pericolo | m
+    # TrattoStradale(?t), haPericolo(?t, 0), haPunteggioPericolo(?t, ?p), lessThanOrEqual(?p, 0.4) -> haStatoSicurezza(?t, ontology.Sicuro)
+    m = (haPericolo == 0) & ~np.isnan(haPunteggioPericolo) & (haPunteggioPericolo <= 0.4)
+    haStatoSicurezza__Sicuro = haStatoSicurezza__Sicuro | m
+    # TrattoStradale(?t), haTipoRischio(?t, ontology.RischioLuminosità) -> haRaccomandazione(?t, ontology.ProtezioneLuminosa), haRaccomandazione(?t, ontology.AumentareDistanzaSicurezza)
+    m = haTipoRischio__RischioLuminosità
+    haRaccomandazione__ProtezioneLuminosa = haRaccomandazione__ProtezioneLuminosa | m
+    haRaccomandazione__AumentareDistanzaSicurezza = haRaccomandazione__AumentareDistanzaSicurezza | m
+    # TrattoStradale(?t), haTipoRischio(?t, ontology.RischioVelocità) -> haRaccomandazione(?t, ontology.Rallentare), haRaccomandazione(?t, ontology.PrestareAttenzione), haRaccomandazione(?t, ontology.AumentareDistanzaSicurezza)
+    m = haTipoRischio__RischioVelocità
+    haRaccomandazione__Rallentare = haRaccomandazione__Rallentare | m
+    haRaccomandazione__PrestareAttenzione = haRaccomandazione__PrestareAttenzione | m
+    haRaccomandazione__AumentareDistanzaSicurezza = haRaccomandazione__AumentareDistanzaSicurezza | m
+    # TrattoStradale(?t), haTipoRischio(?t, ontology.RischioCurvatura) -> haRaccomandazione(?t, ontology.Rallentare), haRaccomandazione(?t, ontology.PrestareAttenzione)
+    m = haTipoRischio__RischioCurvatura
+    haRaccomandazione__Rallentare = haRaccomandazione__Rallentare | m
+    haRaccomandazione__PrestareAttenzione = haRaccomandazione__PrestareAttenzione | m
+    # TrattoStradale(?t), haTipoRischio(?t, ontology.RischioVisibilità) -> haRaccomandazione(?t, ontology.PrestareAttenzione), haRaccomandazione(?t, ontology.Rallentare), haRaccomandazione(?t, ontology.AumentareDistanzaSicurezza), haRaccomandazione(?t, ontology.ControllaFariAccesi)
+    m = haTipoRischio__RischioVisibilità
+    haRaccomandazione__PrestareAttenzione = haRaccomandazione__PrestareAttenzione | m
+    haRaccomandazione__Rallentare = haRaccomandazione__Rallentare | m
+    haRaccomandazione__AumentareDistanzaSicurezza = haRaccomandazione__AumentareDistanzaSicurezza | m
+    haRaccomandazione__ControllaFariAccesi = haRaccomandazione__ControllaFariAccesi | m
+    # TrattoStradale(?t), haStatoSicurezza(?t, ontology.Sicuro) -> haRaccomandazione(?t, ontology.Normale)
+    m = haStatoSicurezza__Sicuro
+    haRaccomandazione__Normale = haRaccomandazione__Normale | m
+
+    oggetti = {
+        ('haCondizioniMeteo', 'Nebbia'): haCondizioniMeteo__Nebbia,
+        ('haCondizioniMeteo', 'Pioggia'): haCondizioniMeteo__Pioggia,
+        ('haCondizioniMeteo', 'Sole'): haCondizioniMeteo__Sole,
+        ('haIlluminazione', 'Diurno'): haIlluminazione__Diurno,
+        ('haIlluminazione', 'Notturno'): haIlluminazione__Notturno,
+        ('haRaccomandazione', 'AumentareDistanzaSicurezza'): haRaccomandazione__AumentareDistanzaSicurezza,
+        ('haRaccomandazione', 'ControllaFariAccesi'): haRaccomandazione__ControllaFariAccesi,
+        ('haRaccomandazione', 'Normale'): haRaccomandazione__Normale,
+        ('haRaccomandazione', 'PrestareAttenzione'): haRaccomandazione__PrestareAttenzione,
+        ('haRaccomandazione', 'ProtezioneLuminosa'): haRaccomandazione__ProtezioneLuminosa,
+        ('haRaccomandazione', 'Rallentare'): haRaccomandazione__Rallentare,
+        ('haStatoSicurezza', 'Pericolo'): haStatoSicurezza__Pericolo,
+        ('haStatoSicurezza', 'PericoloEstremo'): haStatoSicurezza__PericoloEstremo,
+        ('haStatoSicurezza', 'Sicuro'): haStatoSicurezza__Sicuro,
+        ('haTipoRischio', 'RischioCurvatura'): haTipoRischio__RischioCurvatura,
+        ('haTipoRischio', 'RischioLuminosità'): haTipoRischio__RischioLuminosità,
+        ('haTipoRischio', 'RischioVelocità'): haTipoRischio__RischioVelocità,
+        ('haTipoRischio', 'RischioVisibilità'): haTipoRischio__RischioVisibilità,
+        ('haTipoStrada', 'Autostrada'): haTipoStrada__Autostrada,
+        ('haTipoStrada', 'Rurale'): haTipoStrada__Rurale,
+        ('haTipoStrada', 'Urbana'): haTipoStrada__Urbana,
+    }
+    dati = {
+        'haCurvatura': haCurvatura,
+        'haLimiteVelocità': haLimiteVelocità,
+        'haLimiteVelocitàLegale': haLimiteVelocitàLegale,
+        'haPericolo': haPericolo,
+        'haPunteggioPericolo': haPunteggioPericolo,
+    }
+    return oggetti, dati
+
+# Tabella di decisione: 3456 firme, 38 combinazioni distinte di conclusioni
+TABELLA_FIRME, TABELLA_INDICI, TABELLA_CONCLUSIONI = _carica_tabella()
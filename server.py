@@ -0,0 +1,135 @@
+"""Demone SafeDrive: processo residente con modelli e ontologia già caricati.
+
+Ogni richiesta è una riga JSON con i segmenti grezzi (colonne di road_system.csv):
+    {"segmenti": [{"id": 1, "road_type": "urban", ...}, ...], "pianifica": true}
+e riceve una riga JSON di risposta:
+    {"risultati": [{"id": 1, "pericolo": 0, ..., "raccomandazioni": [...]}, ...],
+     "limiti": [50, ...], "millisecondi": 12.3, "individui_caricati": 0}
+"pianifica" (default true) attiva messa in sicurezza e CSP; in caso di errore la risposta è {"errore": "..."}.
+
+Uso:
+    python server.py                          # protocollo JSONL su stdin/stdout
+    python server.py --socket /tmp/safedrive.sock   # socket Unix locale
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import contextlib
+import socketserver
+import pandas as pd
+import data_model_onto_csp_integration as sd #safe drive
+
+MODELLO_CLASSIFICAZIONE = "models/logistic_regression_model_negloglossTarget.pkl"
+MODELLO_REGRESSIONE = "models/random_forest_model.pkl"
+
+# Richiesta di riscaldamento eseguita all'avvio (una riga di data/road_system.csv)
+RICHIESTA_DI_PROVA = {"segmenti": [{"id": 0, "road_type": "urban", "num_lanes": 2, "curvature": 0.25,
+                                    "speed_limit": 60, "lighting": "daylight", "weather": "rainy",
+                                    "road_signs_present": True, "public_road": True, "time_of_day": "evening",
+                                    "holiday": True, "school_season": True}]}
+
+def valore_json(x):
+    """Valori che json non conosce: mancanti -> null, scalari numpy -> Python, il resto come testo"""
+    if pd.api.types.is_scalar(x) and pd.isna(x):
+        return None
+    if hasattr(x, "tolist"):
+        return x.tolist()
+    return str(x)
+
+class ServerSafeDrive(object):
+    """Tiene caldi modelli, encoder e ontologia e serve una richiesta alla volta"""
+
+    def __init__(self, path_classificazione, path_regressione, mmap=False, path_tabella=None, dimensione_cache=0,
+                 ragionatore="nativo", riferimento=None):
+        """
+        riferimento : segmenti su cui allenare una sola volta, all'avvio, lo scaler del classificatore
+        se il suo encoder non è stato costruito (sd.carica_encoder_congelati)
+        """
+        # encoder fissi dall'avvio: nessuno scaler viene mai allenato sui segmenti delle richieste
+        encoder = sd.carica_encoder_congelati(path_classificazione, path_regressione, riferimento)
+        self.modelli = sd.carica_modelli(path_classificazione, path_regressione, mmap, path_tabella, dimensione_cache,
+                                         encoder)
+        self.ragionatore = ragionatore
+        # l'ontologia di owlready2 non è thread-safe: le richieste vengono serializzate
+        self.lock = threading.Lock()
+
+        # tutto il lavoro del primo utilizzo si paga qui, non sulla prima richiesta
+        sd.mappe_ontologia()
+        sd.avvia_ragionatore(ragionatore)
+        inizio = time.perf_counter()
+        self.elabora(RICHIESTA_DI_PROVA)
+        print(f"🔥 Richiesta di prova completata in {(time.perf_counter() - inizio) * 1000:.0f}ms")
+
+    def elabora(self, richiesta):
+        inizio = time.perf_counter()
+        segmenti = pd.DataFrame(richiesta["segmenti"])
+        with self.lock:
+            risultati, limiti = sd.elabora_segmenti(segmenti, self.modelli, richiesta.get("pianifica", True),
+                                                   self.ragionatore)
+        return {
+            "risultati": risultati.to_dict("records"),
+            "limiti": limiti,
+            "millisecondi": (time.perf_counter() - inizio) * 1000,
+            "individui_caricati": sd.individui_caricati(),
+        }
+
+    def rispondi(self, riga):
+        """Elabora una riga JSONL e restituisce la riga di risposta (anche per gli errori di serializzazione)"""
+        try:
+            return json.dumps(self.elabora(json.loads(riga)), ensure_ascii=False, default=valore_json) + "\n"
+        except Exception as e:
+            return json.dumps({"errore": f"{type(e).__name__}: {e}"}, ensure_ascii=False) + "\n"
+
+def servi_stdin(server):
+    uscita = sys.stdout
+    # le stampe di avanzamento della pipeline non devono sporcare il protocollo su stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        for riga in sys.stdin:
+            if riga.strip():
+                uscita.write(server.rispondi(riga))
+                uscita.flush()
+
+def servi_socket(server, path):
+    class GestoreRichieste(socketserver.StreamRequestHandler):
+        def handle(self):
+            for riga in self.rfile:
+                if riga.strip():
+                    self.wfile.write(server.rispondi(riga).encode("utf-8"))
+
+    if os.path.exists(path):
+        os.remove(path)
+    with socketserver.ThreadingUnixStreamServer(path, GestoreRichieste) as servizio:
+        print(f"🚦 SafeDrive in ascolto su {path}", file=sys.stderr)
+        with contextlib.redirect_stdout(sys.stderr):
+            servizio.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Demone SafeDrive con modelli e ontologia residenti")
+    parser.add_argument("--socket", default=None, help="path del socket Unix; senza, protocollo JSONL su stdin")
+    parser.add_argument("--classificatore", default=MODELLO_CLASSIFICAZIONE)
+    parser.add_argument("--regressore", default=MODELLO_REGRESSIONE)
+    parser.add_argument("--mmap", action="store_true", help="usa i modelli memory-mapped (models/foresta_piatta.py)")
+    parser.add_argument("--tabella", default=None, help="tabella del rischio precalcolata (models/tabella_rischio.py)")
+    parser.add_argument("--cache", type=int, default=0, help="righe della cache LRU davanti a ogni modello")
+    parser.add_argument("--ragionatore", choices=["pellet", "nativo", "firme", "compilato", "persistente", "mondi"],
+                        default="nativo", help="ragionatore delle regole dell'ontologia (vedi conclusioni_segmenti); "
+                                               "pellet avvia una JVM a ogni richiesta")
+    parser.add_argument("--riferimento", default="data/road_system.csv",
+                        help="csv su cui allenare all'avvio lo scaler del classificatore se manca il suo encoder")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        server = ServerSafeDrive(args.classificatore, args.regressore, args.mmap, args.tabella, args.cache,
+                                 args.ragionatore, sd.carica_dataset(args.riferimento))
+
+    try:
+        if args.socket:
+            servi_socket(server, args.socket)
+        else:
+            servi_stdin(server)
+    except KeyboardInterrupt:
+        pass